@@ -0,0 +1,168 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Murf renders MP3 at 24 kHz; that file is served as-is when it is what the client wants
+SOURCE_FORMAT = "mp3"
+SOURCE_SAMPLE_RATE = 24000
+
+FORMATS = {"mp3": ("audio/mpeg", ".mp3"), "opus": ("audio/ogg", ".ogg"), "wav": ("audio/wav", ".wav")}
+SAMPLE_RATES = (8000, 16000, 24000)
+BITRATES_KBPS = (16, 24, 32, 48, 64, 96)
+# Measured throughput must be this many times the audio bitrate, so playback never stalls
+THROUGHPUT_HEADROOM = float(os.getenv("AUDIO_THROUGHPUT_HEADROOM", "4"))
+THROUGHPUT_SMOOTHING = 0.3  # EWMA weight of the newest sample
+
+
+class AudioProfile(NamedTuple):
+    format: str
+    sample_rate: int
+    bitrate_kbps: Optional[int] = None  # None keeps the source encoding
+
+    @property
+    def key(self) -> str:
+        return f"{self.format}-{self.sample_rate}-{self.bitrate_kbps or 'src'}"
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][0]
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.format][1]
+
+    def kbps(self) -> float:
+        if self.format == "wav":
+            return self.sample_rate * 16 / 1000
+        return self.bitrate_kbps or 64
+
+
+SOURCE_PROFILE = AudioProfile(SOURCE_FORMAT, SOURCE_SAMPLE_RATE)
+
+# Downgrade ladder, best first; adaptive selection only ever moves down it
+LADDER = [
+    SOURCE_PROFILE,
+    AudioProfile("mp3", 24000, 48),
+    AudioProfile("opus", 24000, 32),
+    AudioProfile("opus", 16000, 24),
+    AudioProfile("opus", 16000, 16),
+]
+
+
+def _closest(value: int, allowed: tuple) -> int:
+    return min(allowed, key=lambda a: abs(a - value))
+
+
+def negotiate(fmt: Optional[str] = None, sample_rate: Optional[int] = None,
+              bitrate_kbps: Optional[int] = None) -> AudioProfile:
+    """Map what the client asked for onto the nearest variant we produce."""
+    fmt = (fmt or SOURCE_FORMAT).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported audio format '{fmt}', choose from {sorted(FORMATS)}")
+    rate = _closest(sample_rate, SAMPLE_RATES) if sample_rate else SOURCE_SAMPLE_RATE
+    if fmt == "wav":
+        return AudioProfile("wav", rate)
+    bitrate = _closest(bitrate_kbps, BITRATES_KBPS) if bitrate_kbps else None
+    if fmt == SOURCE_FORMAT and rate == SOURCE_SAMPLE_RATE and bitrate is None:
+        return SOURCE_PROFILE
+    return AudioProfile(fmt, rate, bitrate or (32 if fmt == "opus" else 64))
+
+
+def reported_kbps(headers) -> Optional[float]:
+    """Throughput the client measured itself: X-Client-Throughput-Kbps, or the Downlink
+    client hint (Mbps). Server-side timing can't see this for short clips, which fit in
+    socket buffers and "finish" at memory speed."""
+    for name, scale in (("x-client-throughput-kbps", 1.0), ("downlink", 1000.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                kbps = float(value) * scale
+            except ValueError:
+                continue
+            if kbps > 0:
+                return kbps
+    return None
+
+
+class ThroughputTracker:
+    """Smoothed client-reported throughput per client, used to step audio quality down."""
+
+    def __init__(self, max_clients: int = 4096):
+        self.max_clients = max_clients
+        self._kbps = {}
+        self._lock = threading.Lock()
+
+    def record(self, client: str, sample: float):
+        with self._lock:
+            previous = self._kbps.pop(client, None)
+            self._kbps[client] = sample if previous is None else (
+                THROUGHPUT_SMOOTHING * sample + (1 - THROUGHPUT_SMOOTHING) * previous)
+            if len(self._kbps) > self.max_clients:
+                self._kbps.pop(next(iter(self._kbps)))
+
+    def kbps(self, client: str) -> Optional[float]:
+        return self._kbps.get(client)
+
+    def adapt(self, client: str, profile: AudioProfile) -> AudioProfile:
+        measured = self.kbps(client)
+        if measured is None or profile.kbps() * THROUGHPUT_HEADROOM <= measured:
+            return profile
+        # Cheapest rung that is no richer than the request and still fits, else the floor
+        for rung in LADDER:
+            if rung.kbps() <= profile.kbps() and rung.kbps() * THROUGHPUT_HEADROOM <= measured:
+                return rung
+        return LADDER[-1]
+
+
+class TranscodeCache:
+    """Transcoded variants of generated audio, computed once per (file, profile) on disk."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {"hits": 0, "transcodes": 0, "transcode_ms": 0.0}
+
+    def variant(self, source: Path, profile: AudioProfile) -> Path:
+        if profile == SOURCE_PROFILE:
+            return source
+        target = self.root / f"{source.stem}.{profile.key}{profile.extension}"
+        if target.exists():
+            self.stats["hits"] += 1
+            return target
+        with self._lock_for(target.name):
+            # Another request may have produced it while we waited
+            if target.exists():
+                self.stats["hits"] += 1
+                return target
+            start = time.perf_counter()
+            self._transcode(source, target, profile)
+            self.stats["transcodes"] += 1
+            self.stats["transcode_ms"] += (time.perf_counter() - start) * 1000
+        with self._locks_guard:
+            self._locks.pop(target.name, None)
+        return target
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _transcode(self, source: Path, target: Path, profile: AudioProfile):
+        if not shutil.which("ffmpeg"):
+            raise RuntimeError("ffmpeg is required to transcode audio")
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(source),
+               "-ac", "1", "-ar", str(profile.sample_rate)]
+        if profile.format == "opus":
+            cmd += ["-c:a", "libopus", "-b:a", f"{profile.bitrate_kbps}k", "-f", "ogg"]
+        elif profile.format == "mp3":
+            cmd += ["-c:a", "libmp3lame", "-b:a", f"{profile.bitrate_kbps}k", "-f", "mp3"]
+        else:
+            cmd += ["-c:a", "pcm_s16le", "-f", "wav"]
+        partial = target.with_name(target.name + ".part")
+        subprocess.run(cmd + [str(partial)], check=True)
+        partial.replace(target)
@@ -0,0 +1,102 @@
+"""Content-addressed storage and cache-friendly serving for generated audio.
+
+Files are named by the SHA-256 of their bytes, so a URL never changes meaning and
+can be cached forever: repeat plays are answered by the browser (or any CDN) and
+never reach Python. ETag, size and media type are computed once when a file is
+stored and kept in a sidecar, so serving never re-reads or hashes the audio.
+
+Behind nginx, set AUDIO_X_ACCEL_PREFIX=/_media/ and let nginx do the byte work
+(sendfile, Range) for the bytes while Python only picks the file:
+
+    location /_media/ {
+        internal;
+        alias /path/to/uploads/media/;
+        sendfile on;
+        tcp_nopush on;
+    }
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+AUDIO_X_ACCEL_PREFIX = os.getenv("AUDIO_X_ACCEL_PREFIX")
+META_SUFFIX = ".meta.json"
+
+
+class AudioStore:
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._meta = {}
+        self._lock = threading.Lock()
+
+    def put_file(self, path: Path, sha256: Optional[str] = None) -> str:
+        """Move a finished file into the store and return its content-addressed name.
+
+        Pass sha256 when the bytes were already hashed while being written.
+        """
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        name = f"{sha256[:32]}{path.suffix}"
+        target = self.root / name
+        with self._lock:
+            if target.exists():
+                path.unlink()  # same bytes already stored
+            else:
+                os.replace(path, target)
+                meta = {
+                    "etag": f'"{sha256}"',
+                    "size": target.stat().st_size,
+                    "media_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                }
+                (self.root / (name + META_SUFFIX)).write_text(json.dumps(meta))
+                self._meta[name] = meta
+        return name
+
+    def path(self, name: str) -> Path:
+        return self.root / Path(name).name
+
+    def metadata(self, name: str) -> Optional[dict]:
+        meta = self._meta.get(name)
+        if meta is None:
+            sidecar = self.root / (name + META_SUFFIX)
+            if not sidecar.exists():
+                return None
+            meta = self._meta[name] = json.loads(sidecar.read_text())
+        return meta
+
+
+class ImmutableAudioFiles(StaticFiles):
+    """StaticFiles for an AudioStore: strong content ETags and immutable caching."""
+
+    def __init__(self, store: AudioStore):
+        super().__init__(directory=str(store.root))
+        self.store = store
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        name = Path(full_path).name
+        meta = self.store.metadata(name)
+        if meta is None:  # sidecars and stray files are not served
+            return Response(status_code=404)
+        headers = {"etag": meta["etag"], "cache-control": IMMUTABLE, "accept-ranges": "bytes"}
+        if self.is_not_modified(headers, Headers(scope=scope)):
+            return Response(status_code=304, headers=headers)
+        if AUDIO_X_ACCEL_PREFIX:
+            headers["x-accel-redirect"] = AUDIO_X_ACCEL_PREFIX + name
+            return Response(headers=headers, media_type=meta["media_type"])
+        # FileResponse handles Range itself and uses pathsend (zero-copy) where the server offers it
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                            headers=headers, media_type=meta["media_type"])
@@ -0,0 +1,58 @@
+"""Per-turn cost of building the Gemini request body as a session grows.
+
+Compares rebuilding the whole `contents` list from history on every turn with
+GeminiPayloadCache, which only encodes the messages added since the last turn.
+
+    python bench_payload.py
+"""
+import json
+import os
+import tempfile
+import time
+
+from gemini_payload import GeminiPayloadCache
+from session_store import SessionStore
+
+SESSION_LENGTHS = [100, 300, 600]
+SAMPLE_TURNS = 50
+
+
+def full_rebuild(store: SessionStore, session_id: str) -> bytes:
+    payload = {
+        "contents": [
+            {"role": m["role"], "parts": [{"text": m["text"]}]}
+            for m in store.history(session_id)
+        ]
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def run(turns: int):
+    store = SessionStore(os.path.join(tempfile.mkdtemp(), "bench_payload.db"))
+    payloads = GeminiPayloadCache(store)
+    rebuild_s = incremental_s = 0.0
+    for t in range(turns):
+        role = "user" if t % 2 == 0 else "assistant"
+        store.append("bench", role, f"turn {t}: " + "some words about the weather " * 8)
+        if t < turns - SAMPLE_TURNS:
+            payloads.body("bench")  # keep the cache warm, as a live session would
+            continue
+        start = time.perf_counter()
+        old = full_rebuild(store, "bench")
+        rebuild_s += time.perf_counter() - start
+        start = time.perf_counter()
+        new = payloads.body("bench")
+        incremental_s += time.perf_counter() - start
+        assert json.loads(old) == json.loads(new)
+    return rebuild_s / SAMPLE_TURNS * 1e6, incremental_s / SAMPLE_TURNS * 1e6
+
+
+def main():
+    print(f"{'turns':>6}{'rebuild us':>12}{'incremental us':>16}{'speedup':>9}")
+    for turns in SESSION_LENGTHS:
+        rebuild_us, incremental_us = run(turns)
+        print(f"{turns:>6}{rebuild_us:>12.0f}{incremental_us:>16.0f}{rebuild_us / incremental_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
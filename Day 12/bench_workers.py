@@ -0,0 +1,96 @@
+"""Throughput of /agent/history/{session_id} as the worker count grows.
+
+Starts serve.py with 1, 2 and 4 workers against a throwaway session database,
+then drives it from several client processes, each keeping one keep-alive
+connection and one session id (so requests stay on that session's worker).
+Workers only add throughput up to the number of CPU cores, so that is printed too.
+
+    python bench_workers.py
+"""
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+WORKER_COUNTS = [1, 2, 4]
+CLIENTS = 16
+SESSIONS = 64
+TURNS_PER_SESSION = 200
+DURATION_S = 5.0
+PORT = 8765
+
+
+def seed(db_path: str):
+    os.environ["SESSION_DB"] = db_path
+    from session_store import SessionStore
+    store = SessionStore(db_path)
+    for s in range(SESSIONS):
+        for t in range(TURNS_PER_SESSION):
+            role = "user" if t % 2 == 0 else "assistant"
+            store.append(f"bench{s}", role, f"message {t} of session {s} " * 4)
+
+
+def client(index: int) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+    path = f"/agent/history/bench{index % SESSIONS}"
+    done, deadline = 0, time.monotonic() + DURATION_S
+    while time.monotonic() < deadline:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            done += 1
+    conn.close()
+    return done
+
+
+def wait_ready(timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def main():
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_sessions.db")
+    seed(db_path)
+    env = {
+        **os.environ,
+        "SESSION_DB": db_path,
+        # main.py refuses to start without keys; the benchmark never calls the providers
+        "ASSEMBLYAI_API_KEY": os.getenv("ASSEMBLYAI_API_KEY", "bench"),
+        "MURF_API_KEY": os.getenv("MURF_API_KEY", "bench"),
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "bench"),
+    }
+    baseline = None
+    print(f"{os.cpu_count()} CPU cores")
+    print(f"{'workers':>8}{'req/s':>10}{'speedup':>10}")
+    for workers in WORKER_COUNTS:
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--port", str(PORT),
+             "--host", "127.0.0.1"],
+            env=env,
+        )
+        try:
+            wait_ready()
+            with ProcessPoolExecutor(CLIENTS) as pool:
+                total = sum(pool.map(client, range(CLIENTS)))
+            rps = total / DURATION_S
+            baseline = baseline or rps
+            print(f"{workers:>8}{rps:>10.0f}{rps / baseline:>10.2f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Whole-request budget; a client may ask for less with X-Deadline-Ms
+REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", "30"))
+# Don't start (or keep waiting in) a stage with less than this left, in seconds
+STAGE_MIN_S = {"stt": 1.0, "llm": 0.5, "tts": 0.5, "download": 0.2}
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str, remaining_s: float):
+        super().__init__(f"Deadline exceeded in {stage} ({max(remaining_s, 0) * 1000:.0f} ms of budget left)")
+        self.stage = stage
+
+
+class Deadline:
+    """One time budget for a whole request; every stage gets whatever is left of it."""
+
+    def __init__(self, budget_s: float = REQUEST_DEADLINE_S):
+        self.budget_s = budget_s
+        self.started = time.monotonic()
+        self.expires = self.started + budget_s
+        self.stages = {}
+        self.stage_name = None
+
+    @classmethod
+    def from_header(cls, deadline_ms: Optional[int]) -> "Deadline":
+        if deadline_ms and deadline_ms > 0:
+            return cls(min(deadline_ms / 1000, REQUEST_DEADLINE_S))
+        return cls()
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def timeout(self) -> float:
+        """Timeout for the next call in the current stage; raises if the stage can't be met."""
+        remaining = self.remaining()
+        if remaining < STAGE_MIN_S.get(self.stage_name, 0.1):
+            raise DeadlineExceeded(self.stage_name, remaining)
+        return remaining
+
+    @contextmanager
+    def stage(self, name: str):
+        self.stage_name = name
+        start = time.monotonic()
+        try:
+            self.timeout()  # abort early rather than start work that can't finish
+            yield
+        finally:
+            self.stages[name] = round((time.monotonic() - start) * 1000, 1)
+            self.stage_name = None
+
+    def report(self) -> dict:
+        return {
+            "budget_ms": round(self.budget_s * 1000),
+            "used_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "stages_ms": dict(self.stages),
+        }
@@ -0,0 +1,47 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+PAYLOAD_CACHE_SESSIONS = int(os.getenv("PAYLOAD_CACHE_SESSIONS", "1024"))
+
+
+def encode_message(role: str, text: str) -> bytes:
+    return json.dumps({"role": role, "parts": [{"text": text}]}).encode("utf-8")
+
+
+class GeminiPayloadCache:
+    """Keeps each session's serialized Gemini `contents` so a turn only encodes new messages.
+
+    The cache is per process; it reads only rows newer than the last one it encoded,
+    so appends made by other workers are picked up too. If the row count does not add
+    up (the session was cleared elsewhere) the body is rebuilt from scratch.
+    """
+
+    def __init__(self, store, max_sessions: int = PAYLOAD_CACHE_SESSIONS):
+        self.store = store
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> [last_id, count, bytearray]
+        self._lock = threading.Lock()  # body() runs in the threadpool; the store read stays outside it
+
+    def body(self, session_id: str) -> bytes:
+        with self._lock:
+            last_id, count, encoded = self._sessions.pop(session_id, None) or (0, 0, bytearray())
+        total, rows = self.store.messages_after(session_id, last_id)
+        if count + len(rows) != total:
+            last_id, count, encoded = 0, 0, bytearray()
+            total, rows = self.store.messages_after(session_id, 0)
+        for row_id, role, text in rows:
+            if encoded:
+                encoded += b","
+            encoded += encode_message(role, text)
+            last_id = row_id
+        with self._lock:
+            self._sessions[session_id] = [last_id, total, encoded]
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return b'{"contents":[' + encoded + b"]}"
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
@@ -1,13 +1,28 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Optional
 import requests
+import asyncio
+import hashlib
+import json
 import os
+import tempfile
 import time
+from collections import OrderedDict
+
+from audio_store import IMMUTABLE, AudioStore, ImmutableAudioFiles
+from audio_formats import ThroughputTracker, TranscodeCache, negotiate, reported_kbps
+from deadline import Deadline, DeadlineExceeded
+from gemini_payload import GeminiPayloadCache
+from phrase_cache import FALLBACK_TEXT, REPEAT_TEXT, PhraseCache, load_phrases
+from response_cache import ResponseCache
+from retry import Retrier
+from session_store import SessionStore
 
 # Load environment variables
 load_dotenv()
@@ -35,10 +50,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Generated speech lives in a content-addressed store served with immutable caching
+audio_store = AudioStore(uploads_dir / "media")
+app.mount("/media", ImmutableAudioFiles(audio_store), name="media")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
-# In-memory chat history store
-chat_sessions: Dict[str, List[Dict[str, str]]] = {}
+# Chat history store, shared across uvicorn worker processes
+chat_sessions = SessionStore()
+
+# Serialized Gemini request body per session, extended one turn at a time
+gemini_payloads = GeminiPayloadCache(chat_sessions)
+
+# Answers (text + saved audio) for stateless /llm/query prompts
+llm_cache = ResponseCache()
+
+# Raised when a stage runs out of request budget (ours, or a socket timeout derived from it)
+TIMEOUT_ERRORS = (DeadlineExceeded, requests.exceptions.Timeout)
+
+# Retries transient provider failures per call type, within a shared budget
+retrier = Retrier()
+# Finished AssemblyAI uploads are reused for the same audio instead of being sent again
+UPLOAD_REUSE_TTL_S = float(os.getenv("UPLOAD_REUSE_TTL_S", "3600"))
+UPLOAD_REUSE_MAX = 64
+
+# Negotiated audio variants, transcoded once and kept next to the originals
+audio_variants = TranscodeCache(uploads_dir / "variants")
+client_throughput = ThroughputTracker()
 
 # Murf voice IDs
 MURF_VOICE_ECHO = "en-UK-ruby"
@@ -50,24 +87,36 @@ class AssemblyTranscriber:
         self.api_key = api_key
         self.upload_url = "https://api.assemblyai.com/v2/upload"
         self.transcript_url = "https://api.assemblyai.com/v2/transcript"
+        self._uploads = OrderedDict()  # sha256 of audio -> (upload_url, expires_at)
 
-    def upload_audio(self, audio_bytes: bytes) -> str:
+    def upload_audio(self, audio_bytes: bytes, deadline: Deadline) -> str:
+        digest = hashlib.sha256(audio_bytes).hexdigest()
+        cached = self._uploads.get(digest)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
         headers = {"authorization": self.api_key}
-        r = requests.post(self.upload_url, headers=headers, data=audio_bytes)
+        r = retrier.call("stt_upload", lambda: requests.post(
+            self.upload_url, headers=headers, data=audio_bytes, timeout=deadline.timeout()), deadline)
         r.raise_for_status()
-        return r.json()["upload_url"]
+        upload_url = r.json()["upload_url"]
+        self._uploads[digest] = (upload_url, time.monotonic() + UPLOAD_REUSE_TTL_S)
+        while len(self._uploads) > UPLOAD_REUSE_MAX:
+            self._uploads.popitem(last=False)
+        return upload_url
 
-    def request_transcription(self, audio_url: str) -> str:
+    def request_transcription(self, audio_url: str, deadline: Deadline) -> str:
         headers = {"authorization": self.api_key, "content-type": "application/json"}
         payload = {"audio_url": audio_url}
-        r = requests.post(self.transcript_url, headers=headers, json=payload)
+        r = retrier.call("stt_submit", lambda: requests.post(
+            self.transcript_url, headers=headers, json=payload, timeout=deadline.timeout()), deadline)
         r.raise_for_status()
         return r.json()["id"]
 
-    def get_transcription_result(self, transcript_id: str, poll_interval: float = 1.0) -> dict:
+    def get_transcription_result(self, transcript_id: str, deadline: Deadline, poll_interval: float = 1.0) -> dict:
         headers = {"authorization": self.api_key}
         while True:
-            r = requests.get(f"{self.transcript_url}/{transcript_id}", headers=headers)
+            r = retrier.call("stt_poll", lambda: requests.get(
+                f"{self.transcript_url}/{transcript_id}", headers=headers, timeout=deadline.timeout()), deadline)
             r.raise_for_status()
             result = r.json()
             status = result.get("status")
@@ -75,18 +124,21 @@ class AssemblyTranscriber:
                 return result
             if status == "failed":
                 raise Exception("Transcription failed: " + str(result))
+            # Stop polling once the next check would land past the deadline
+            if deadline.remaining() - poll_interval < 0:
+                raise DeadlineExceeded("stt", deadline.remaining())
             time.sleep(poll_interval)
 
-    def transcribe(self, audio_bytes: bytes) -> dict:
-        audio_url = self.upload_audio(audio_bytes)
-        transcript_id = self.request_transcription(audio_url)
-        return self.get_transcription_result(transcript_id)
+    def transcribe(self, audio_bytes: bytes, deadline: Deadline) -> dict:
+        audio_url = self.upload_audio(audio_bytes, deadline)
+        transcript_id = self.request_transcription(audio_url, deadline)
+        return self.get_transcription_result(transcript_id, deadline)
 
 
 transcriber = AssemblyTranscriber(ASSEMBLYAI_API_KEY)
 
 
-def murf_tts(voice_id: str, text: str) -> str:
+def murf_tts(voice_id: str, text: str, deadline: Deadline) -> str:
     if not text or not text.strip():
         raise ValueError("Empty text for TTS")
     murf_payload = {
@@ -99,14 +151,103 @@ def murf_tts(voice_id: str, text: str) -> str:
         "Content-Type": "application/json",
         "api-key": MURF_API_KEY
     }
-    r = requests.post("https://api.murf.ai/v1/speech/generate", headers=murf_headers, json=murf_payload)
+    r = retrier.call("tts", lambda: requests.post(
+        "https://api.murf.ai/v1/speech/generate", headers=murf_headers, json=murf_payload,
+        timeout=deadline.timeout()), deadline)
     r.raise_for_status()
     murf_json = r.json()
     return murf_json.get("audioFile") or murf_json.get("audioUrl") or murf_json.get("audio_url")
 
 
+def download_audio(audio_url: str, deadline: Deadline) -> str:
+    """Download Murf audio into the content-addressed store; returns its /media URL."""
+    audio_resp = retrier.call("download", lambda: requests.get(
+        audio_url, stream=True, timeout=deadline.timeout()), deadline)
+    audio_resp.raise_for_status()
+    # A unique staging file per download: concurrent requests never share one
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=audio_store.root, prefix=".staging-", suffix=".mp3",
+                                     delete=False) as f:
+        staging = Path(f.name)
+        try:
+            for chunk in audio_resp.iter_content(chunk_size=8192):
+                deadline.timeout()  # a slow trickle can't outlive the request
+                f.write(chunk)
+                digest.update(chunk)
+        except BaseException:
+            f.close()
+            staging.unlink(missing_ok=True)
+            raise
+    return f"/media/{audio_store.put_file(staging, digest.hexdigest())}"
+
+
+# Greetings, "please repeat that" and the fallback reply, held in memory as audio
+phrases = PhraseCache(audio_store, uploads_dir / "phrases.json")
+# Per-phrase budget while warming; a phrase that misses it is rendered on first use instead
+WARM_PHRASE_DEADLINE_S = float(os.getenv("WARM_PHRASE_DEADLINE_S", "5"))
+
+
+def render_phrase(text: str) -> str:
+    deadline = Deadline(WARM_PHRASE_DEADLINE_S)
+    with deadline.stage("tts"):
+        audio_url = murf_tts(MURF_VOICE_LLM, text, deadline)
+    with deadline.stage("download"):
+        return download_audio(audio_url, deadline).rsplit("/", 1)[-1]
+
+
+def speak(voice_id: str, text: str, deadline: Deadline) -> str:
+    """Audio URL for text: a warmed phrase straight from memory, else Murf saved to the store."""
+    cached = phrases.url_for(voice_id, text)
+    if cached:
+        return cached
+    with deadline.stage("tts"):
+        audio_url = murf_tts(voice_id, text, deadline)
+    try:
+        with deadline.stage("download"):
+            return download_audio(audio_url, deadline)
+    except Exception:
+        return audio_url  # fallback to remote URL
+
+
+async def warm_phrases():
+    # Loads from disk when already rendered; only missing phrases call Murf
+    counts = await run_in_threadpool(phrases.warm, MURF_VOICE_LLM, load_phrases(), render_phrase)
+    print(f"Phrase cache ready: {counts}")
+
+
+@app.on_event("startup")
+async def warm_phrase_cache():
+    # In the background so a slow or down Murf never holds up startup; until a phrase
+    # is warm, speak() renders it like any other reply
+    app.state.phrase_warmer = asyncio.create_task(warm_phrases())
+
+
+@app.get("/phrases")
+async def list_phrases():
+    return phrases.phrases()
+
+
+@app.get("/phrases/{name}")
+async def phrase_audio(name: str, request: Request):
+    cached = phrases.get(name)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Unknown phrase audio")
+    audio, meta = cached
+    headers = {"ETag": meta["etag"], "Cache-Control": IMMUTABLE}
+    if request.headers.get("if-none-match") == meta["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=audio, media_type=meta["media_type"], headers=headers)
+
+
+def deadline_failure(deadline: Deadline, e: Exception) -> JSONResponse:
+    # Fast failure once the budget is gone, with what each stage used
+    print(f"Deadline exceeded: {e} {deadline.report()}")
+    return JSONResponse(status_code=504, content={"error": str(e), "timings": deadline.report()})
+
+
 @app.post("/tts/echo")
-async def echo_bot(file: UploadFile = File(...)):
+async def echo_bot(file: UploadFile = File(...), deadline_ms: Optional[int] = Header(None, alias="X-Deadline-Ms")):
+    deadline = Deadline.from_header(deadline_ms)
     if not file:
         raise HTTPException(status_code=400, detail="No audio file provided")
     audio_bytes = await file.read()
@@ -115,40 +256,43 @@ async def echo_bot(file: UploadFile = File(...)):
 
     # Transcribe
     try:
-        transcript_result = transcriber.transcribe(audio_bytes)
+        with deadline.stage("stt"):
+            transcript_result = await run_in_threadpool(transcriber.transcribe, audio_bytes, deadline)
         text = transcript_result.get("text", "").strip()
         if not text:
             return JSONResponse(status_code=400, content={"error": "No text found in transcription"})
+    except TIMEOUT_ERRORS as e:
+        return deadline_failure(deadline, e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
 
     # TTS
     try:
-        audio_url = murf_tts(MURF_VOICE_ECHO, text)
+        with deadline.stage("tts"):
+            audio_url = await run_in_threadpool(murf_tts, MURF_VOICE_ECHO, text, deadline)
+    except TIMEOUT_ERRORS as e:
+        return deadline_failure(deadline, e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Murf TTS request failed: {e}")
 
     # Save locally
-    filename = f"murf_echo_{int(time.time())}.mp3"
-    save_path = uploads_dir / filename
     try:
-        audio_resp = requests.get(audio_url, stream=True)
-        audio_resp.raise_for_status()
-        with open(save_path, "wb") as f:
-            for chunk in audio_resp.iter_content(chunk_size=8192):
-                f.write(chunk)
+        with deadline.stage("download"):
+            local_audio_url = await run_in_threadpool(download_audio, audio_url, deadline)
     except Exception:
         return {
             "status": "success",
             "transcription": text,
             "audio_url": audio_url,
-            "warning": "Could not save audio locally"
+            "warning": "Could not save audio locally",
+            "timings": deadline.report()
         }
 
     return {
         "status": "success",
         "transcription": text,
-        "audio_url": f"/uploads/{filename}"
+        "audio_url": local_audio_url,
+        "timings": deadline.report()
     }
 
 
@@ -156,22 +300,22 @@ async def echo_bot(file: UploadFile = File(...)):
 async def llm_query(
     file: UploadFile = File(None),
     text: str = Form(None),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    deadline_ms: Optional[int] = Header(None, alias="X-Deadline-Ms")
 ):
-    # If session_id provided, maintain chat history, else stateless
-    if session_id:
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = []
-
+    deadline = Deadline.from_header(deadline_ms)
     if file:
         audio_bytes = await file.read()
         if not audio_bytes:
             raise HTTPException(status_code=400, detail="Uploaded file is empty")
         try:
-            transcript_result = transcriber.transcribe(audio_bytes)
+            with deadline.stage("stt"):
+                transcript_result = await run_in_threadpool(transcriber.transcribe, audio_bytes, deadline)
             user_text = transcript_result.get("text", "").strip()
             if not user_text:
                 return JSONResponse(status_code=400, content={"error": "No text found in transcription"})
+        except TIMEOUT_ERRORS as e:
+            return deadline_failure(deadline, e)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
     elif text:
@@ -181,104 +325,181 @@ async def llm_query(
     else:
         raise HTTPException(status_code=400, detail="No audio or text provided")
 
+    # If session_id provided, maintain chat history, else stateless
     if session_id:
         # Append user message to chat history
-        chat_sessions[session_id].append({"role": "user", "text": user_text})
-
-        # Build context for Gemini with full session history
-        gemini_payload = {
-            "contents": [
-                {"role": m["role"], "parts": [{"text": m["text"]}]}
-                for m in chat_sessions[session_id]
-            ]
-        }
+        await run_in_threadpool(chat_sessions.append, session_id, "user", user_text)
+
+        # Build context for Gemini with full session history (only new turns are encoded)
+        gemini_body = await run_in_threadpool(gemini_payloads.body, session_id)
     else:
+        # Stateless: repeated FAQ-style prompts are answered from cache
+        cached = llm_cache.get(user_text)
+        if cached:
+            return {
+                "status": "success",
+                "transcription": user_text,
+                "llm_response": cached["llm_response"],
+                "audio_url": cached["audio_url"],
+                "cached": True
+            }
+
         # Stateless payload
-        gemini_payload = {
+        gemini_body = json.dumps({
             "contents": [{"role": "user", "parts": [{"text": user_text}]}]
-        }
+        }).encode("utf-8")
 
     gemini_url = f"https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
     headers = {"Content-Type": "application/json"}
 
     try:
-        resp = requests.post(gemini_url, headers=headers, json=gemini_payload)
+        with deadline.stage("llm"):
+            resp = await run_in_threadpool(retrier.call, "llm", lambda: requests.post(
+                gemini_url, headers=headers, data=gemini_body, timeout=deadline.timeout()), deadline)
         resp.raise_for_status()
         data = resp.json()
         assistant_text = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
         if not assistant_text:
             raise HTTPException(status_code=500, detail="LLM did not return a response")
+    except TIMEOUT_ERRORS as e:
+        return deadline_failure(deadline, e)
     except requests.exceptions.RequestException as e:
         raise HTTPException(status_code=500, detail=f"Gemini API request failed: {e}")
 
     if session_id:
         # Append assistant response to chat history
-        chat_sessions[session_id].append({"role": "assistant", "text": assistant_text})
+        await run_in_threadpool(chat_sessions.append, session_id, "assistant", assistant_text)
 
-    # Generate TTS audio for assistant answer
+    # Generate TTS audio for assistant answer and save it locally
     try:
-        audio_url = murf_tts(MURF_VOICE_LLM, assistant_text)
+        local_audio_url = await run_in_threadpool(speak, MURF_VOICE_LLM, assistant_text, deadline)
+    except TIMEOUT_ERRORS as e:
+        return deadline_failure(deadline, e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Murf TTS request failed: {e}")
 
-    # Save locally
-    filename = f"murf_llm_{int(time.time())}.mp3"
-    save_path = uploads_dir / filename
-    try:
-        audio_resp = requests.get(audio_url, stream=True)
-        audio_resp.raise_for_status()
-        with open(save_path, "wb") as f:
-            for chunk in audio_resp.iter_content(chunk_size=8192):
-                f.write(chunk)
-        local_audio_url = f"/uploads/{filename}"
-    except Exception:
-        local_audio_url = audio_url  # fallback
-
     result = {
         "status": "success",
         "transcription": user_text,
         "llm_response": assistant_text,
-        "audio_url": local_audio_url
+        "audio_url": local_audio_url,
+        "timings": deadline.report()
     }
     if session_id:
         result["session_id"] = session_id
-        result["chat_history"] = chat_sessions[session_id]
+        result["chat_history"] = await run_in_threadpool(chat_sessions.history, session_id)
+    elif local_audio_url.startswith("/media/"):
+        # Only cache audio we host; Murf's remote URLs expire
+        llm_cache.put(user_text, {"llm_response": assistant_text, "audio_url": local_audio_url})
 
     return result
 
 
+@app.get("/audio/{filename}")
+async def serve_audio(
+    filename: str,
+    request: Request,
+    format: Optional[str] = Query(None),
+    sample_rate: Optional[int] = Query(None),
+    bitrate: Optional[int] = Query(None),
+    adaptive: bool = Query(True),
+    client_id: Optional[str] = Header(None, alias="X-Client-Id")
+):
+    source = audio_store.path(filename)
+    content_addressed = audio_store.metadata(source.name) is not None
+    if not content_addressed:
+        source = uploads_dir / Path(filename).name
+    if not source.is_file():
+        raise HTTPException(status_code=404, detail="Audio not found")
+    try:
+        profile = negotiate(format, sample_rate, bitrate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Step quality down for clients that report slow downloads. Behind serve.py every
+    # connection comes from 127.0.0.1, so key on the forwarded address, not the socket
+    forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+    client = client_id or forwarded or request.client.host
+    measured = reported_kbps(request.headers)
+    if measured:
+        client_throughput.record(client, measured)
+    if adaptive:
+        profile = client_throughput.adapt(client, profile)
+    # A stored file plus a profile always yields the same bytes, so the pair is a strong ETag
+    cache_headers = {"ETag": f'"{source.stem}-{profile.key}"', "X-Audio-Profile": profile.key,
+                     "Accept-CH": "Downlink"}
+    if content_addressed:
+        # Adaptive answers may change per request, so those are revalidated instead of pinned
+        cache_headers["Cache-Control"] = "no-cache" if adaptive else IMMUTABLE
+    if content_addressed and request.headers.get("if-none-match") == cache_headers["ETag"]:
+        return Response(status_code=304, headers=cache_headers)
+    try:
+        path = await run_in_threadpool(audio_variants.variant, source, profile)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Transcode failed: {e}")
+
+    if not content_addressed:
+        cache_headers.pop("ETag")
+    return FileResponse(path, media_type=profile.media_type, headers=cache_headers)
+
+
+@app.get("/metrics/audio")
+async def audio_metrics():
+    return {"transcodes": audio_variants.stats}
+
+
+@app.get("/metrics/retries")
+async def retry_metrics():
+    return retrier.report()
+
+
+@app.get("/llm/cache/stats")
+async def llm_cache_stats():
+    return llm_cache.stats
+
+
 # === UPDATED DAY 11 CHAT HISTORY ENDPOINT ===
 @app.post("/agent/chat/{session_id}")
-async def agent_chat(session_id: str, file: UploadFile = File(...)):
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = []
-
+async def agent_chat(
+    session_id: str,
+    file: UploadFile = File(...),
+    deadline_ms: Optional[int] = Header(None, alias="X-Deadline-Ms")
+):
     # Day 11
+    deadline = Deadline.from_header(deadline_ms)
     try:
         audio_bytes = await file.read()
         if not audio_bytes:
             raise HTTPException(status_code=400, detail="Empty audio file")
 
         # 1) Transcribe audio to text
-        transcript_result = transcriber.transcribe(audio_bytes)
+        with deadline.stage("stt"):
+            transcript_result = await run_in_threadpool(transcriber.transcribe, audio_bytes, deadline)
         user_text = transcript_result.get("text", "").strip()
         if not user_text:
-            raise HTTPException(status_code=400, detail="No text from transcription")
+            # Nothing heard: ask again from memory, without touching the chat history
+            return {
+                "status": "no_speech",
+                "session_id": session_id,
+                "user_message": "",
+                "assistant_message": REPEAT_TEXT,
+                "audio_url": await run_in_threadpool(speak, MURF_VOICE_LLM, REPEAT_TEXT, deadline),
+                "chat_history": await run_in_threadpool(chat_sessions.history, session_id),
+                "timings": deadline.report()
+            }
 
         # 2) Append user question to session history
-        chat_sessions[session_id].append({"role": "user", "text": user_text})
+        await run_in_threadpool(chat_sessions.append, session_id, "user", user_text)
 
         # 3) Build full chat context payload for Gemini
         gemini_url = f"https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
-        payload = {
-            "contents": [
-                {"role": m["role"], "parts": [{"text": m["text"]}]}
-                for m in chat_sessions[session_id]
-            ]
-        }
+        payload = await run_in_threadpool(gemini_payloads.body, session_id)
 
         # 4) Call Gemini LLM for response
-        resp = requests.post(gemini_url, headers={"Content-Type": "application/json"}, json=payload)
+        with deadline.stage("llm"):
+            resp = await run_in_threadpool(retrier.call, "llm", lambda: requests.post(
+                gemini_url, headers={"Content-Type": "application/json"}, data=payload,
+                timeout=deadline.timeout()), deadline)
         resp.raise_for_status()
         data = resp.json()
         assistant_text = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
@@ -286,23 +507,10 @@ async def agent_chat(session_id: str, file: UploadFile = File(...)):
             raise HTTPException(status_code=500, detail="Empty LLM response")
 
         # 5) Append assistant reply to session history
-        chat_sessions[session_id].append({"role": "assistant", "text": assistant_text})
+        await run_in_threadpool(chat_sessions.append, session_id, "assistant", assistant_text)
 
-        # 6) Generate TTS audio for assistant reply
-        audio_url = murf_tts(MURF_VOICE_LLM, assistant_text)
-
-        # 7) Save audio locally (fallback to remote URL if fails)
-        filename = f"chat_{session_id}_{int(time.time())}.mp3"
-        save_path = uploads_dir / filename
-        try:
-            audio_resp = requests.get(audio_url, stream=True)
-            audio_resp.raise_for_status()
-            with open(save_path, "wb") as f:
-                for chunk in audio_resp.iter_content(8192):
-                    f.write(chunk)
-            local_audio_url = f"/uploads/{filename}"
-        except Exception:
-            local_audio_url = audio_url  # fallback to remote URL
+        # 6-7) Generate TTS audio for the reply and save it locally (warmed phrases come from memory)
+        local_audio_url = await run_in_threadpool(speak, MURF_VOICE_LLM, assistant_text, deadline)
 
         # 8) Return result with text and audio URL
         return {
@@ -311,27 +519,37 @@ async def agent_chat(session_id: str, file: UploadFile = File(...)):
             "user_message": user_text,
             "assistant_message": assistant_text,
             "audio_url": local_audio_url,
-            "chat_history": chat_sessions[session_id]
+            "chat_history": await run_in_threadpool(chat_sessions.history, session_id),
+            "timings": deadline.report()
         }
 
     except Exception as e:  # added the exception
-        print(f"Error in /agent/chat/{session_id}: {e}")
+        print(f"Error in /agent/chat/{session_id}: {e} {deadline.report()}")
         return {
             "status": "error",
             "session_id": session_id,
             "error": str(e),
-            "assistant_message": "I'm having trouble connecting right now.",
-            "audio_url": "/uploads/fallback.mp3",
-            "chat_history": chat_sessions[session_id]
+            "assistant_message": FALLBACK_TEXT,
+            # Served from memory: no upstream call while upstreams are failing
+            "audio_url": phrases.url_for(MURF_VOICE_LLM, FALLBACK_TEXT) or "/uploads/fallback.mp3",
+            "chat_history": await run_in_threadpool(chat_sessions.history, session_id),
+            "timings": deadline.report()
         }
 
 
 @app.post("/agent/clear/{session_id}")
 async def clear_session(session_id: str):
-    chat_sessions.pop(session_id, None)
+    await run_in_threadpool(chat_sessions.clear, session_id)
+    gemini_payloads.forget(session_id)
     return {"status": "cleared", "session_id": session_id}
 
 
+@app.get("/agent/history/{session_id}")
+async def session_history(session_id: str):
+    history = await run_in_threadpool(chat_sessions.history, session_id)
+    return {"session_id": session_id, "chat_history": history}
+
+
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "TTS Echo FastAPI server running with LLM & agent chat endpoints"}
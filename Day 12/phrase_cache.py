@@ -0,0 +1,80 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from audio_store import AudioStore
+from response_cache import normalize_prompt
+
+FALLBACK_TEXT = "I'm having trouble connecting right now."
+REPEAT_TEXT = "Sorry, I didn't catch that. Could you please repeat that?"
+DEFAULT_PHRASES = [
+    "Hi! How can I help you today?",
+    REPEAT_TEXT,
+    FALLBACK_TEXT,
+]
+# JSON list of extra phrases to render at startup
+WARM_PHRASES_FILE = os.getenv("WARM_PHRASES_FILE", "warm_phrases.json")
+
+
+def load_phrases(path: str = WARM_PHRASES_FILE) -> list:
+    phrases = list(DEFAULT_PHRASES)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            phrases += [p for p in json.load(f) if p not in phrases]
+    return phrases
+
+
+def phrase_key(voice_id: str, text: str) -> str:
+    return f"{voice_id}:{normalize_prompt(text)}"
+
+
+class PhraseCache:
+    """Common phrases kept as ready-to-send audio in memory.
+
+    Audio is rendered once, stored in the AudioStore and remembered in an on-disk
+    index, so restarts (and every worker) load it from disk instead of calling Murf.
+    """
+
+    def __init__(self, store: AudioStore, index_path: Path):
+        self.store = store
+        self.index_path = index_path
+        self._audio = {}  # phrase key -> media name
+        self._bytes = {}  # media name -> (audio bytes, meta)
+
+    def warm(self, voice_id: str, phrases: list, render) -> dict:
+        """render(text) -> media name; only called for phrases missing from disk."""
+        index = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        counts = {"loaded": 0, "rendered": 0, "failed": 0}
+        for text in phrases:
+            key = phrase_key(voice_id, text)
+            name = index.get(key)
+            if not name or self.store.metadata(name) is None:
+                try:
+                    name = render(text)
+                except Exception as e:
+                    print(f"Could not warm phrase {text!r}: {e}")
+                    counts["failed"] += 1
+                    continue
+                index[key] = name
+                counts["rendered"] += 1
+            else:
+                counts["loaded"] += 1
+            self._audio[key] = name
+            self._bytes[name] = (self.store.path(name).read_bytes(), self.store.metadata(name))
+        if counts["rendered"]:
+            # Every worker warms at startup; a per-process temp file keeps their writes apart
+            tmp = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(index, indent=2))
+            tmp.replace(self.index_path)
+        return counts
+
+    def url_for(self, voice_id: str, text: str) -> Optional[str]:
+        name = self._audio.get(phrase_key(voice_id, text))
+        return f"/phrases/{name}" if name else None
+
+    def get(self, name: str) -> Optional[tuple]:
+        return self._bytes.get(name)
+
+    def phrases(self) -> dict:
+        return {key: f"/phrases/{name}" for key, name in self._audio.items()}
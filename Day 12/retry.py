@@ -0,0 +1,126 @@
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from deadline import STAGE_MIN_S, Deadline
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Retry budget: every first attempt earns RETRY_BUDGET_RATIO tokens, every retry spends one,
+# so retries stay a bounded fraction of traffic during an outage
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = float(os.getenv("RETRY_BUDGET_MAX", "20"))
+
+
+def never_sent(e: Exception) -> bool:
+    """True when the request provably never reached the server (safe to repeat anything)."""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(e, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def transient(e: Exception) -> bool:
+    """Connection resets and truncated bodies; only safe for calls without side effects."""
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError))
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, statuses: tuple = RETRYABLE_STATUSES, retry_error=transient,
+                 base_delay_s: float = 0.2, max_delay_s: float = 2.0):
+        self.max_attempts = max_attempts
+        self.statuses = statuses
+        self.retry_error = retry_error
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries from many requests instead of syncing them up
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** attempt))
+
+
+# Retry-safety per call. Reads and side-effect-free generation retry freely; creating a
+# transcript job only retries when the server cannot have acted on it; uploads are not
+# resent at all once bytes may have left (the transcriber reuses finished uploads instead).
+POLICIES = {
+    "stt_upload": RetryPolicy(max_attempts=3, statuses=(), retry_error=never_sent),
+    "stt_submit": RetryPolicy(max_attempts=3, statuses=(429, 503), retry_error=never_sent),
+    "stt_poll": RetryPolicy(max_attempts=6, base_delay_s=0.5, max_delay_s=4.0),
+    "llm": RetryPolicy(max_attempts=3),
+    "tts": RetryPolicy(max_attempts=3),
+    "download": RetryPolicy(max_attempts=3),
+}
+
+
+class Retrier:
+    """Runs provider calls under their RetryPolicy, a shared retry budget and the request deadline."""
+
+    def __init__(self, policies: dict = POLICIES, budget_ratio: float = RETRY_BUDGET_RATIO,
+                 budget_max: float = RETRY_BUDGET_MAX):
+        self.policies = policies
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self._tokens = budget_max
+        self._lock = threading.Lock()
+        self.metrics = {
+            call: {"calls": 0, "retries": 0, "recovered": 0, "gave_up": 0, "budget_denied": 0}
+            for call in policies
+        }
+
+    def call(self, name: str, send, deadline: Optional[Deadline] = None) -> requests.Response:
+        """send() performs one attempt and returns a requests.Response."""
+        policy = self.policies[name]
+        stats = self.metrics[name]
+        with self._lock:
+            stats["calls"] += 1
+            self._tokens = min(self.budget_max, self._tokens + self.budget_ratio)
+
+        attempt = 0
+        while True:
+            error, response = None, None
+            try:
+                response = send()
+                if response.status_code not in policy.statuses:
+                    if attempt:
+                        stats["recovered"] += 1
+                    return response
+            except requests.exceptions.RequestException as e:
+                if not policy.retry_error(e):
+                    raise
+                error = e
+
+            attempt += 1
+            delay = self._retry_delay(policy, attempt, response, deadline, stats)
+            if delay is None:
+                stats["gave_up"] += 1
+                if error:
+                    raise error
+                return response  # caller's raise_for_status reports the final status
+            stats["retries"] += 1
+            if response is not None:
+                response.close()  # hand a stream=True connection back before retrying
+            time.sleep(delay)
+
+    def _retry_delay(self, policy: RetryPolicy, attempt: int, response, deadline, stats) -> Optional[float]:
+        if attempt >= policy.max_attempts:
+            return None
+        delay = policy.backoff(attempt)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        # No point waiting if the next attempt could not finish inside the request budget
+        if deadline and deadline.remaining() - delay < STAGE_MIN_S.get(deadline.stage_name, 0.1):
+            return None
+        with self._lock:
+            if self._tokens < 1:
+                stats["budget_denied"] += 1
+                return None
+            self._tokens -= 1
+        return delay
+
+    def report(self) -> dict:
+        return {"budget_tokens": round(self._tokens, 2), "calls": self.metrics}
@@ -0,0 +1,162 @@
+"""Run several uvicorn workers behind a small session-affinity router.
+
+    python serve.py --workers 4 --port 8000 [--app main:app]
+
+Each worker is a separate uvicorn process on its own local port. The router reads
+only the request head, picks a worker from the session id and then pipes bytes
+both ways. Plain HTTP requests are sent upstream with Connection: close, so every
+request is routed on its own; WebSocket upgrades stay pinned to one worker for
+their lifetime. The client address is passed on in X-Forwarded-For.
+
+Session id lookup order: /agent/chat/{id} or /agent/*/{id} path, ?session_id=,
+X-Session-Id header, session_id cookie. Requests without one are spread round-robin.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import re
+import signal
+import subprocess
+import sys
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+AGENT_PATH = re.compile(r"^/agent/[^/]+/([^/?]+)")
+HEAD_LIMIT = 64 * 1024
+# Hop-by-hop headers the router sets itself
+REWRITTEN = {"connection", "keep-alive", "x-forwarded-for"}
+
+
+def session_key(target: str, headers: dict):
+    url = urlsplit(target)
+    match = AGENT_PATH.match(url.path)
+    if match:
+        return match.group(1)
+    query = parse_qs(url.query)
+    if "session_id" in query:
+        return query["session_id"][0]
+    if "x-session-id" in headers:
+        return headers["x-session-id"]
+    for part in headers.get("cookie", "").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == "session_id" and value:
+            return value
+    return None
+
+
+class AffinityRouter:
+    def __init__(self, worker_ports: list, host: str = "127.0.0.1"):
+        self.worker_ports = worker_ports
+        self.host = host
+        self._round_robin = itertools.cycle(worker_ports)
+
+    def pick(self, key):
+        if key is None:
+            return next(self._round_robin)
+        # Stable hash so every process and restart agrees on the owner
+        return self.worker_ports[zlib.crc32(key.encode()) % len(self.worker_ports)]
+
+    async def handle(self, client_reader, client_writer):
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            client_writer.close()
+            return
+        lines = head.decode("latin-1").split("\r\n")
+        _, target, _ = (lines[0].split(" ", 2) + ["", ""])[:3]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if value:
+                headers[name.strip().lower()] = value.strip()
+
+        upgrade = headers.get("upgrade", "").lower() == "websocket"
+        head = self.rewrite(lines, headers, client_writer.get_extra_info("peername"), upgrade)
+        port = self.pick(session_key(target, headers))
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(self.host, port)
+        except OSError:
+            client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+            await client_writer.drain()
+            client_writer.close()
+            return
+        upstream_writer.write(head)
+        # One request per connection (or one WebSocket); the worker closes when done
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer),
+        )
+
+    def rewrite(self, lines: list, headers: dict, peer, upgrade: bool) -> bytes:
+        kept = [line for line in lines[1:] if line and line.partition(":")[0].strip().lower() not in REWRITTEN]
+        forwarded = ", ".join(filter(None, [headers.get("x-forwarded-for"), peer[0] if peer else None]))
+        extra = ["Connection: Upgrade" if upgrade else "Connection: close"]
+        if forwarded:
+            extra.append(f"X-Forwarded-For: {forwarded}")
+        return "\r\n".join([lines[0], *kept, *extra, "", ""]).encode("latin-1")
+
+    async def _pipe(self, reader, writer):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+def start_workers(app: str, count: int, base_port: int) -> list:
+    procs = []
+    for i in range(count):
+        procs.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", app,
+            "--host", "127.0.0.1", "--port", str(base_port + i), "--log-level", "warning",
+        ]))
+    return procs
+
+
+async def wait_for_workers(ports: list, timeout: float = 30.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    for port in ports:
+        while True:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.close()
+                break
+            except OSError:
+                if loop.time() > deadline:
+                    raise RuntimeError(f"Worker on port {port} did not start")
+                await asyncio.sleep(0.1)
+
+
+async def main(args):
+    ports = [args.worker_base_port + i for i in range(args.workers)]
+    procs = start_workers(args.app, args.workers, args.worker_base_port)
+    try:
+        await wait_for_workers(ports)
+        router = AffinityRouter(ports)
+        server = await asyncio.start_server(router.handle, args.host, args.port, limit=HEAD_LIMIT)
+        print(f"Routing {args.host}:{args.port} -> {args.workers} workers on ports {ports[0]}-{ports[-1]}")
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--worker-base-port", type=int, default=9100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+
+
+class SessionStore:
+    """Chat history shared by every worker process through one local SQLite file.
+
+    WAL mode lets workers read while another appends, so conversations survive
+    running uvicorn with more than one worker.
+    """
+
+    def __init__(self, path: str = SESSION_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " role TEXT NOT NULL,"
+                " text TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; FastAPI runs sync work in a threadpool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        rows = self._conn().execute(
+            "SELECT role, text FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return [{"role": role, "text": text} for role, text in rows]
+
+    def messages_after(self, session_id: str, after_id: int) -> Tuple[int, List[tuple]]:
+        """Total message count plus the (id, role, text) rows newer than after_id."""
+        conn = self._conn()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        rows = conn.execute(
+            "SELECT id, role, text FROM messages WHERE session_id = ? AND id > ? ORDER BY id",
+            (session_id, after_id),
+        ).fetchall()
+        return count, rows
+
+    def append(self, session_id: str, role: str, text: str):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO messages (session_id, role, text) VALUES (?, ?, ?)",
+                (session_id, role, text),
+            )
+
+    def clear(self, session_id: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
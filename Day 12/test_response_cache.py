@@ -0,0 +1,16 @@
+from response_cache import ResponseCache
+
+
+def test_exact_prompt_hits_after_normalization():
+    cache = ResponseCache()
+    cache.put("What is the capital of France?", {"llm_response": "Paris"})
+    assert cache.get("what is the capital of france") == {"llm_response": "Paris"}
+
+
+def test_near_identical_prompt_with_different_answer_misses():
+    cache = ResponseCache()
+    cache.put("What is the capital of France?", {"llm_response": "Paris"})
+    assert cache.get("What is the capital of Spain?") is None
+    cache.put("Convert 10 miles to km", {"llm_response": "16.09 km"})
+    assert cache.get("Convert 10 km to miles") is None
+    assert cache.stats["hits"] == 0
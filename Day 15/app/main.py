@@ -2,11 +2,13 @@ from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, WebSock
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 import logging
 
 from app.schemas import TextRequest, LLMResponse
 from app.services.stt import speech_to_text
-from app.services.tts import text_to_speech
+from app.services.tts import text_to_speech, murf_text_to_speech, render_to_temp_file, remove_file
+from app.services.hedging import HedgedCall
 from app.services.llm import query_llm
 from app.utils.logger import get_logger
 
@@ -18,6 +20,8 @@ load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MURF_API_KEY = os.getenv("MURF_API_KEY")
+# Murf first, gTTS as the hedge; set TTS_HEDGING=0 (or leave out the Murf key) for gTTS only
+TTS_HEDGING = bool(MURF_API_KEY) and os.getenv("TTS_HEDGING", "1") != "0"
 
 # Create FastAPI app
 app = FastAPI(title="AI Voice Agent")
@@ -53,17 +57,37 @@ async def stt_endpoint(file: UploadFile = File(...)):
 
 
 # --- TTS Endpoint ---
+async def murf_tts(text: str) -> str:
+    return await render_to_temp_file(murf_text_to_speech, text)
+
+async def gtts_tts(text: str) -> str:
+    return await render_to_temp_file(text_to_speech, text)
+
+hedged_tts = HedgedCall(murf_tts, gtts_tts, discard=remove_file)
+
 @app.post("/tts")
 async def tts_endpoint(request: TextRequest):
     try:
-        audio_file = text_to_speech(request.text)
-        logger.info("TTS processed")
-        return FileResponse(audio_file, media_type="audio/mp3", filename="output.mp3")
+        if not TTS_HEDGING:
+            audio_file = text_to_speech(request.text)
+            logger.info("TTS processed")
+            return FileResponse(audio_file, media_type="audio/mp3", filename="output.mp3")
+
+        audio_file, provider = await hedged_tts(request.text)
+        logger.info(f"TTS processed by {provider}")
+        return FileResponse(audio_file, media_type="audio/mp3", filename="output.mp3",
+                            headers={"X-TTS-Provider": provider},
+                            background=BackgroundTask(os.remove, audio_file))
     except Exception as e:
         logger.error(f"TTS error: {str(e)}")
         raise HTTPException(status_code=500, detail="Text-to-Speech failed")
 
 
+@app.get("/metrics/tts-hedge")
+def tts_hedge_metrics():
+    return {"enabled": TTS_HEDGING, **hedged_tts.stats()}
+
+
 # --- LLM Endpoint ---
 @app.post("/llm/query", response_model=LLMResponse)
 async def llm_endpoint(request: TextRequest):
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+# Fire the secondary once the primary is slower than this percentile of its recent latencies
+HEDGE_PERCENTILE = float(os.getenv("TTS_HEDGE_PERCENTILE", "0.95"))
+# Used until MIN_SAMPLES primary latencies have been seen
+HEDGE_INITIAL_DELAY_MS = float(os.getenv("TTS_HEDGE_INITIAL_DELAY_MS", "2000"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("TTS_HEDGE_MIN_DELAY_MS", "200"))
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class HedgedCall:
+    """Calls `primary`, and also `secondary` if primary is late; the first success wins.
+
+    The hedge deadline tracks a percentile of the primary's recent successful
+    latencies, so only its slow tail is hedged. The losing call is cancelled, or its
+    result handed to `discard` if it finished too. If the primary fails before the
+    deadline, the secondary runs straight away (a failover).
+    """
+
+    def __init__(self, primary, secondary, percentile: float = HEDGE_PERCENTILE,
+                 initial_delay_ms: float = HEDGE_INITIAL_DELAY_MS, min_delay_ms: float = HEDGE_MIN_DELAY_MS,
+                 discard=None):
+        self.primary = primary
+        self.secondary = secondary
+        self.discard = discard  # called with a losing call's result, e.g. to delete its file
+        self.percentile = percentile
+        self.initial_delay_ms = initial_delay_ms
+        self.min_delay_ms = min_delay_ms
+        self._latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"calls": 0, "hedges_fired": 0, "hedges_won": 0, "failovers": 0}
+
+    def hedge_delay_ms(self) -> float:
+        if len(self._latencies_ms) < MIN_SAMPLES:
+            return self.initial_delay_ms
+        latencies = sorted(self._latencies_ms)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile))
+        return max(latencies[index], self.min_delay_ms)
+
+    async def __call__(self, *args):
+        """Returns (result, "primary" | "secondary")."""
+        self.counts["calls"] += 1
+        primary = asyncio.create_task(self._timed_primary(*args))
+        tasks = {primary}
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay_ms() / 1000)
+            if primary in done:
+                if primary.exception() is None:
+                    winner = primary
+                    return primary.result(), "primary"
+                self.counts["failovers"] += 1
+                return await self.secondary(*args), "secondary"
+
+            self.counts["hedges_fired"] += 1
+            secondary = asyncio.create_task(self.secondary(*args))
+            tasks.add(secondary)
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Both may land in the same wait; the primary wins the tie
+                for task in sorted(done, key=lambda t: t is secondary):
+                    if task.exception() is None:
+                        winner = task
+                        if task is secondary:
+                            self.counts["hedges_won"] += 1
+                            return task.result(), "secondary"
+                        return task.result(), "primary"
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    if self.discard:
+                        self.discard(task.result())
+                else:
+                    task.cancel()
+
+    async def _timed_primary(self, *args):
+        start = time.perf_counter()
+        try:
+            result = await self.primary(*args)
+        except asyncio.CancelledError:
+            # Lost to the hedge: the true latency is at least this long. Leaving it out
+            # would keep only fast samples and pull the hedge deadline ever lower
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+            raise
+        self._latencies_ms.append((time.perf_counter() - start) * 1000)
+        return result
+
+    def stats(self) -> dict:
+        calls = self.counts["calls"]
+        fired = self.counts["hedges_fired"]
+        return {
+            **self.counts,
+            "hedge_rate": round(fired / calls, 3) if calls else 0.0,
+            "hedge_win_rate": round(self.counts["hedges_won"] / fired, 3) if fired else 0.0,
+            "hedge_delay_ms": round(self.hedge_delay_ms(), 1),
+        }
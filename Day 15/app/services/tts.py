@@ -1,14 +1,69 @@
+import asyncio
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 from gtts import gTTS
 
 OUTPUT_FILE = "app/static/output.mp3"
 
-def text_to_speech(text: str) -> str:
+MURF_API_URL = "https://api.murf.ai/v1/speech/generate"
+MURF_VOICE_ID = os.getenv("MURF_VOICE_ID", "en-US-terrell")
+
+# Blocking provider calls run here so a hedged loser can finish (and be discarded) off the loop
+_tts_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tts")
+
+
+def text_to_speech(text: str, output_file: str = OUTPUT_FILE) -> str:
     """Convert text to speech and save as an MP3 file."""
     if not text.strip():
         raise ValueError("Text for TTS is empty")
 
     tts = gTTS(text=text, lang="en")
-    tts.save(OUTPUT_FILE)
+    tts.save(output_file)
+
+    return output_file
+
+
+def murf_text_to_speech(text: str, output_file: str, voice_id: str = MURF_VOICE_ID) -> str:
+    """Generate speech with Murf and download the MP3 to output_file."""
+    if not text.strip():
+        raise ValueError("Text for TTS is empty")
+
+    headers = {"api-key": os.getenv("MURF_API_KEY"), "Content-Type": "application/json"}
+    body = {"text": text, "voiceId": voice_id, "format": "MP3"}
+    response = requests.post(MURF_API_URL, headers=headers, json=body, timeout=30)
+    response.raise_for_status()
+    audio_url = response.json().get("audioFile")
+    if not audio_url:
+        raise ValueError("Murf response has no audioFile")
+
+    audio = requests.get(audio_url, timeout=30)
+    audio.raise_for_status()
+    with open(output_file, "wb") as f:
+        f.write(audio.content)
+    return output_file
+
+
+async def render_to_temp_file(render, text: str) -> str:
+    """Run a blocking renderer into a fresh temp MP3 and return its path.
+
+    If the caller is cancelled the worker thread cannot be stopped, so its file is
+    removed as soon as it finishes.
+    """
+    fd, path = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    future = _tts_pool.submit(render, text, path)
+    try:
+        return await asyncio.wrap_future(future)
+    except BaseException:
+        future.add_done_callback(lambda _: remove_file(path))
+        raise
+
 
-    return OUTPUT_FILE
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
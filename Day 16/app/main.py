@@ -1,7 +1,14 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import wave
+from fastapi.responses import Response
+from typing import Optional
+import asyncio
 import logging
+import re
+import uuid
+
+from app.services.decoder import WebmOpusDecoder
+from app.services.recorder import SegmentedRecorder, load_index, read_range
 
 app = FastAPI(title="AI Voice Agent")
 
@@ -28,22 +35,63 @@ def root():
 @app.websocket("/ws/audio")
 async def websocket_audio(websocket: WebSocket):
     await websocket.accept()
-    filename = "streamed_audio.wav"
+    session_id = uuid.uuid4().hex
+    # The client sends audio/webm;codecs=opus chunks, decode them to PCM as they arrive
+    decoder = await WebmOpusDecoder(sample_rate=16000).start()
+    recorder = SegmentedRecorder(session_id, sample_rate=decoder.sample_rate, sample_width=2, channels=1)
+    await websocket.send_json({"type": "session", "session_id": session_id})
+
+    async def pcm_to_recorder():
+        async for frame in decoder.frames():
+            recorder.write(frame)
 
-    wf = wave.open(filename, "wb")
-    wf.setnchannels(1)     
-    wf.setsampwidth(2)      
-    wf.setframerate(44100)  
+    pcm_task = asyncio.create_task(pcm_to_recorder())
 
     try:
         while True:
             data = await websocket.receive_bytes()
-            wf.writeframes(data)
+            await decoder.feed(data)
             logger.info(f"📩 Received audio chunk ({len(data)} bytes)")
     except WebSocketDisconnect:
         logger.info("❌ WebSocket disconnected")
     finally:
-        wf.close()
+        await decoder.close()
+        await pcm_task
+        recorder.close()
+
+
+# --- Recorded sessions: compact index + time-range fetch ---
+# Session ids are uuid4().hex; anything else could walk out of the recordings folder
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def check_session_id(session_id: str):
+    if not SESSION_ID.match(session_id):
+        raise HTTPException(status_code=404, detail="Unknown recording session")
+
+
+@app.get("/recordings/{session_id}/index")
+def recording_index(session_id: str):
+    check_session_id(session_id)
+    entries = load_index(session_id)
+    if not entries:
+        raise HTTPException(status_code=404, detail="Unknown recording session")
+    return {"session_id": session_id, "segments": entries}
+
+
+@app.get("/recordings/{session_id}")
+async def recording_range(
+    session_id: str,
+    start_ms: int = Query(0, ge=0),
+    end_ms: Optional[int] = Query(None, gt=0),
+):
+    check_session_id(session_id)
+    try:
+        # Decoding can shell out to ffmpeg, keep it off the event loop
+        wav_bytes = await asyncio.to_thread(read_range, session_id, start_ms, end_ms)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=wav_bytes, media_type="audio/wav")
 
 
 # --- Day 1–5 Endpoints (commented out) ---
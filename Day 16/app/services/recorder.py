@@ -0,0 +1,197 @@
+import io
+import json
+import logging
+import lzma
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+SEGMENT_SECONDS = float(os.getenv("RECORDING_SEGMENT_SECONDS", "10"))
+MAX_TOTAL_BYTES = int(os.getenv("RECORDINGS_MAX_BYTES", str(500 * 1024 * 1024)))
+# "flac" (lossless) or "opus" (low bitrate) need ffmpeg; "xz" is the pure-Python fallback
+CODEC = os.getenv("RECORDING_CODEC", "flac")
+OPUS_BITRATE = os.getenv("RECORDING_OPUS_BITRATE", "24k")
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.jsonl"
+_EXTENSIONS = {"flac": ".flac", "opus": ".ogg", "xz": ".pcm.xz"}
+
+# Shared background pool so compression never blocks the WebSocket handler
+_compressor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recorder")
+_index_lock = threading.Lock()
+_quota_lock = threading.Lock()
+
+
+def _resolve_codec(codec: str) -> str:
+    if codec in ("flac", "opus") and shutil.which("ffmpeg"):
+        return codec
+    return "xz"
+
+
+def _pcm_format_args(sample_rate: int, sample_width: int, channels: int) -> list:
+    return ["-f", f"s{sample_width * 8}le", "-ar", str(sample_rate), "-ac", str(channels)]
+
+
+def _encode(pcm: bytes, path: str, codec: str, sample_rate: int, sample_width: int, channels: int):
+    if codec == "xz":
+        with open(path, "wb") as f:
+            f.write(lzma.compress(pcm, preset=6))
+        return
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    cmd += _pcm_format_args(sample_rate, sample_width, channels) + ["-i", "pipe:0"]
+    if codec == "opus":
+        cmd += ["-c:a", "libopus", "-b:a", OPUS_BITRATE]
+    else:
+        cmd += ["-c:a", "flac", "-compression_level", "8"]
+    subprocess.run(cmd + [path], input=pcm, check=True)
+
+
+def _decode(path: str, codec: str, sample_rate: int, sample_width: int, channels: int) -> bytes:
+    if codec == "xz":
+        with open(path, "rb") as f:
+            return lzma.decompress(f.read())
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", path]
+    cmd += _pcm_format_args(sample_rate, sample_width, channels) + ["pipe:1"]
+    return subprocess.run(cmd, capture_output=True, check=True).stdout
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+def _enforce_quota(root: str):
+    """Delete the oldest sessions until the recordings dir fits in MAX_TOTAL_BYTES."""
+    with _quota_lock:
+        sessions = [e for e in os.scandir(root) if e.is_dir()]
+        sizes = {e.path: _dir_size(e.path) for e in sessions}
+        total = sum(sizes.values())
+        for entry in sorted(sessions, key=lambda e: e.stat().st_mtime):
+            if total <= MAX_TOTAL_BYTES:
+                break
+            shutil.rmtree(entry.path, ignore_errors=True)
+            total -= sizes[entry.path]
+
+
+class SegmentedRecorder:
+    """Writes a PCM stream as rotating segments that are compressed in the background."""
+
+    def __init__(self, session_id: str, sample_rate: int = 44100, sample_width: int = 2,
+                 channels: int = 1, segment_seconds: float = SEGMENT_SECONDS,
+                 root: str = RECORDINGS_DIR):
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.root = root
+        self.session_dir = os.path.join(root, session_id)
+        self.codec = _resolve_codec(CODEC)
+        self.frame_bytes = sample_width * channels
+        self.segment_bytes = int(segment_seconds * sample_rate) * self.frame_bytes
+        os.makedirs(self.session_dir, exist_ok=True)
+
+        self._buffer = bytearray()
+        self._seq = 0
+        self._written_frames = 0
+        self._pending = []
+
+    def write(self, data: bytes):
+        self._buffer += data
+        while len(self._buffer) >= self.segment_bytes:
+            segment = bytes(self._buffer[:self.segment_bytes])
+            del self._buffer[:self.segment_bytes]
+            self._rotate(segment)
+
+    def close(self):
+        # Drop a trailing partial frame so segments stay sample-aligned
+        usable = len(self._buffer) - len(self._buffer) % self.frame_bytes
+        if usable:
+            self._rotate(bytes(self._buffer[:usable]))
+        self._buffer.clear()
+
+    def flush(self):
+        """Block until every rotated segment has been compressed and indexed."""
+        for future in self._pending:
+            future.result()
+        self._pending.clear()
+
+    def _rotate(self, pcm: bytes):
+        frames = len(pcm) // self.frame_bytes
+        entry = {
+            "seq": self._seq,
+            "start_ms": self._written_frames * 1000 // self.sample_rate,
+            "end_ms": (self._written_frames + frames) * 1000 // self.sample_rate,
+            "file": f"{self._seq:06d}{_EXTENSIONS[self.codec]}",
+            "codec": self.codec,
+            "sample_rate": self.sample_rate,
+            "sample_width": self.sample_width,
+            "channels": self.channels,
+        }
+        self._seq += 1
+        self._written_frames += frames
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(_compressor.submit(self._compress, pcm, entry))
+
+    def _compress(self, pcm: bytes, entry: dict):
+        path = os.path.join(self.session_dir, entry["file"])
+        try:
+            _encode(pcm, path, entry["codec"], self.sample_rate, self.sample_width, self.channels)
+            entry["bytes"] = os.path.getsize(path)
+        except Exception as e:
+            # ffmpeg missing or crashed: keep a trace of the lost span in the index
+            logger.exception(f"Recording {self.session_id}: segment {entry['seq']} failed to encode")
+            entry["error"] = str(e)
+            if os.path.exists(path):
+                os.remove(path)
+        with _index_lock:
+            with open(os.path.join(self.session_dir, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        _enforce_quota(self.root)
+
+
+def load_index(session_id: str, root: str = RECORDINGS_DIR) -> list:
+    path = os.path.join(root, session_id, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda e: e["seq"])
+
+
+def read_range(session_id: str, start_ms: int = 0, end_ms: int = None,
+               root: str = RECORDINGS_DIR) -> bytes:
+    """Return a WAV covering [start_ms, end_ms), decoding only the overlapping segments."""
+    entries = [
+        e for e in load_index(session_id, root)
+        if "error" not in e and e["end_ms"] > start_ms and (end_ms is None or e["start_ms"] < end_ms)
+    ]
+    if not entries:
+        raise FileNotFoundError(f"No recorded audio for {session_id} in that range")
+
+    first = entries[0]
+    sample_rate, sample_width, channels = first["sample_rate"], first["sample_width"], first["channels"]
+    frame_bytes = sample_width * channels
+
+    def to_offset(ms: int, segment_start_ms: int) -> int:
+        return max(0, (ms - segment_start_ms) * sample_rate // 1000) * frame_bytes
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(sample_rate)
+        for e in entries:
+            pcm = _decode(os.path.join(root, session_id, e["file"]), e["codec"],
+                          sample_rate, sample_width, channels)
+            lo = to_offset(start_ms, e["start_ms"])
+            hi = len(pcm) if end_ms is None else min(len(pcm), to_offset(end_ms, e["start_ms"]))
+            wf.writeframes(pcm[lo:hi])
+    return out.getvalue()
@@ -1,9 +1,14 @@
 import os
 import asyncio
+import base64
+import json
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from app.services.decoder import WebmOpusDecoder
+from app.services.stt import pcm_to_text
+
 app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
@@ -20,19 +25,55 @@ app.mount("/static", StaticFiles(directory=static_path), name="static")
 async def root():
     return {"message": "Go to /static/index.html in browser"}
 
+# Seconds of decoded PCM handed to STT at a time
+STT_WINDOW_SECONDS = 3
+# Windows waiting for STT before decoding (and so the socket) is held back
+STT_MAX_PENDING_WINDOWS = 4
+
+
 @app.websocket("/ws/audio")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     print("Client connected")
 
+    decoder = await WebmOpusDecoder(sample_rate=16000).start()
+    window_bytes = decoder.sample_rate * 2 * STT_WINDOW_SECONDS
+
+    windows: asyncio.Queue = asyncio.Queue(maxsize=STT_MAX_PENDING_WINDOWS)
+
+    async def pcm_to_windows():
+        # Keep draining ffmpeg while STT runs; wait only once STT is a few windows behind
+        window = bytearray()
+        async for frame in decoder.frames():
+            window += frame
+            if len(window) >= window_bytes:
+                await windows.put(bytes(window))
+                window.clear()
+        if window:
+            await windows.put(bytes(window))
+        await windows.put(None)
+
+    async def windows_to_stt():
+        while (pcm := await windows.get()) is not None:
+            text = await asyncio.to_thread(pcm_to_text, pcm, decoder.sample_rate)
+            if text:
+                await websocket.send_text(text)
+
+    stt_task = asyncio.gather(pcm_to_windows(), windows_to_stt())
+
     try:
         async for message in websocket.iter_text():
-            # Simulate transcription delay
-            await asyncio.sleep(0.5)
-            # Fake transcription text
-            fake_text = "Hello, this is AI."
-            await websocket.send_text(fake_text)
+            chunk = json.loads(message).get("audio")
+            if chunk:
+                await decoder.feed(base64.b64decode(chunk))
     except Exception as e:
         print("WebSocket error:", e)
+    finally:
+        await decoder.close()
+        try:
+            await stt_task
+        except Exception as e:
+            print("STT error:", e)
+            stt_task.cancel()  # the decoder side may be blocked on a full queue
 
     print("Connection closed")
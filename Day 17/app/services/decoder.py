@@ -0,0 +1,56 @@
+import asyncio
+import shutil
+
+
+class WebmOpusDecoder:
+    """Incrementally decodes MediaRecorder webm/opus fragments into 16-bit PCM frames.
+
+    Fragments are piped into a long-lived ffmpeg process as they arrive, so nothing
+    waits for (or buffers) the whole recording.
+    """
+
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, frame_ms: int = 20):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_bytes = sample_rate * channels * 2 * frame_ms // 1000
+        self._proc = None
+
+    async def start(self):
+        if not shutil.which("ffmpeg"):
+            raise RuntimeError("ffmpeg is required to decode webm/opus audio")
+        self._proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            # Start decoding from the first cluster instead of probing seconds of input
+            "-fflags", "+nobuffer", "-probesize", "4096", "-analyzeduration", "0",
+            "-f", "webm", "-i", "pipe:0",
+            "-f", "s16le", "-ac", str(self.channels), "-ar", str(self.sample_rate),
+            "-flush_packets", "1", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        return self
+
+    async def feed(self, chunk: bytes):
+        self._proc.stdin.write(chunk)
+        await self._proc.stdin.drain()
+
+    async def frames(self):
+        """Yield fixed-size PCM frames as soon as ffmpeg produces them."""
+        while True:
+            try:
+                yield await self._proc.stdout.readexactly(self.frame_bytes)
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    yield e.partial
+                return
+
+    async def close(self):
+        if self._proc is None:
+            return
+        if not self._proc.stdin.is_closing():
+            self._proc.stdin.close()
+        try:
+            await asyncio.wait_for(self._proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            self._proc.kill()
+            await self._proc.wait()
@@ -12,3 +12,17 @@ async def speech_to_text(file):
             audio_data = recognizer.record(source)
             text = recognizer.recognize_google(audio_data)
     return text
+
+
+def pcm_to_text(pcm: bytes, sample_rate: int = 16000, sample_width: int = 2) -> str:
+    """Transcribe a window of raw PCM without going through a temp file."""
+    recognizer = sr.Recognizer()
+    audio_data = sr.AudioData(pcm, sample_rate, sample_width)
+    try:
+        return recognizer.recognize_google(audio_data)
+    except sr.UnknownValueError:
+        return ""
+    except sr.RequestError as e:
+        # A failed request loses this window only; the stream carries on with the next
+        print("STT request failed:", e)
+        return ""
@@ -3,6 +3,9 @@ import asyncio
 import websockets
 import json
 import base64
+import re
+import time
+import httpx
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
@@ -12,6 +15,19 @@ import uvicorn
 # Load environment variables
 load_dotenv()
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_STREAM_URL = (
+    "https://generativelanguage.googleapis.com/v1beta/models/"
+    f"gemini-1.5-flash:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+)
+# Start Gemini once the partial transcript has not changed for this long
+SPECULATION_STABLE_MS = int(os.getenv("SPECULATION_STABLE_MS", "300"))
+# Send raw PCM frames upstream; set to "false" to fall back to base64 JSON messages
+ASSEMBLYAI_BINARY_AUDIO = os.getenv("ASSEMBLYAI_BINARY_AUDIO", "true").lower() == "true"
+
+SAMPLE_RATE = 16000
+FRAME_MS = 50
+FRAME_BYTES = SAMPLE_RATE * 2 * FRAME_MS // 1000  # 16-bit mono
 
 # FastAPI app
 app = FastAPI()
@@ -27,6 +43,234 @@ app.add_middleware(
 
 HTML_FILE = "index.html"
 
+
+class FrameRechunker:
+    """Re-chunks arbitrary client buffers into fixed ~50 ms frames.
+
+    Whole frames are sliced out of the incoming buffer as memoryviews; only the
+    leftover tail that straddles two buffers is copied.
+    """
+
+    def __init__(self, frame_bytes: int = FRAME_BYTES):
+        self.frame_bytes = frame_bytes
+        self.copies = 0
+        self._pending = bytearray()
+
+    def push(self, data: bytes) -> list:
+        frames = []
+        view = memoryview(data)
+        if self._pending:
+            need = self.frame_bytes - len(self._pending)
+            self._pending += view[:need]
+            self.copies += 1
+            view = view[need:]
+            if len(self._pending) < self.frame_bytes:
+                return frames
+            frames.append(bytes(self._pending))
+            self._pending.clear()
+        whole = len(view) - len(view) % self.frame_bytes
+        for i in range(0, whole, self.frame_bytes):
+            frames.append(view[i:i + self.frame_bytes])
+        if whole < len(view):
+            self._pending += view[whole:]
+            self.copies += 1
+        return frames
+
+    def flush(self) -> list:
+        if not self._pending:
+            return []
+        frame = bytes(self._pending)
+        self._pending.clear()
+        return [frame]
+
+
+def normalize_transcript(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+async def stream_gemini(http: httpx.AsyncClient, prompt: str):
+    payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    async with http.stream("POST", GEMINI_STREAM_URL, json=payload) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = json.loads(line[len("data: "):])
+            parts = data.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+            text = "".join(p.get("text", "") for p in parts)
+            if text:
+                yield text
+
+
+class Speculation:
+    """A Gemini generation started from a partial transcript, buffered until committed."""
+
+    def __init__(self, http: httpx.AsyncClient, text: str):
+        self.text = text
+        self.key = normalize_transcript(text)
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self.failed = False
+        self.chunks = asyncio.Queue()
+        self.task = asyncio.create_task(self._generate(http))
+
+    async def _generate(self, http):
+        try:
+            async for chunk in stream_gemini(http, self.text):
+                if self.first_token_at is None:
+                    self.first_token_at = time.monotonic()
+                self.chunks.put_nowait(chunk)
+        except Exception as e:
+            print("Gemini streaming error:", e)
+            self.failed = True
+        finally:
+            self.finished_at = time.monotonic()
+            self.chunks.put_nowait(None)
+
+    def saved_ms(self, turn_ended: float) -> float:
+        """Time to first token saved by starting early.
+
+        A fresh call at turn end would need as long as this one took to its first
+        token, so the saving is capped there rather than the whole head start.
+        """
+        ready = self.first_token_at or self.finished_at or turn_ended
+        return round((min(turn_ended, ready) - self.started) * 1000, 1)
+
+    async def stream(self):
+        while (chunk := await self.chunks.get()) is not None:
+            yield chunk
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class SpeculativeResponder:
+    """Starts Gemini on a stable partial transcript and commits it if the final text matches."""
+
+    def __init__(self, websocket: WebSocket, http: httpx.AsyncClient):
+        self.websocket = websocket
+        self.http = http
+        self.finals = []
+        self.hypothesis = ""
+        self.speculation = None
+        self.timer = None
+        self.reply_task = None
+        self.stats = {"turns": 0, "speculations": 0, "hits": 0, "misses": 0, "saved_ms": 0.0}
+
+    def on_partial(self, text: str):
+        hypothesis = " ".join(self.finals + [text])
+        if normalize_transcript(hypothesis) == normalize_transcript(self.hypothesis):
+            return
+        self.hypothesis = hypothesis
+        if self.timer:
+            self.timer.cancel()
+        self.timer = asyncio.create_task(self._speculate_when_stable(hypothesis))
+
+    def on_final(self, text: str):
+        self.finals.append(text)
+        self.on_partial("")
+
+    async def _speculate_when_stable(self, hypothesis: str):
+        await asyncio.sleep(SPECULATION_STABLE_MS / 1000)
+        key = normalize_transcript(hypothesis)
+        if not key or (self.speculation and self.speculation.key == key):
+            return
+        if self.speculation:
+            self._discard_speculation()
+        self.speculation = Speculation(self.http, hypothesis)
+        self.stats["speculations"] += 1
+
+    def _discard_speculation(self):
+        self.speculation.cancel()
+        self.speculation = None
+        self.stats["misses"] += 1
+
+    def on_turn_end(self):
+        if self.timer:
+            self.timer.cancel()
+        final_text = " ".join(self.finals).strip() or self.hypothesis.strip()
+        self.finals, self.hypothesis = [], ""
+        if not final_text:
+            return
+        self.stats["turns"] += 1
+        turn_ended = time.monotonic()
+
+        speculation, self.speculation = self.speculation, None
+        report = {"type": "speculation", "hit": False, "saved_ms": 0.0}
+        if (speculation and not speculation.failed
+                and speculation.key == normalize_transcript(final_text)):
+            # The answer has been generating since the transcript stabilized
+            self.stats["hits"] += 1
+            report["hit"] = True
+            report["saved_ms"] = speculation.saved_ms(turn_ended)
+            self.stats["saved_ms"] += report["saved_ms"]
+        else:
+            if speculation:
+                speculation.cancel()
+                self.stats["misses"] += 1
+            speculation = Speculation(self.http, final_text)
+        report["hit_rate"] = round(self.stats["hits"] / self.stats["turns"], 3)
+
+        previous = self.reply_task
+        self.reply_task = asyncio.create_task(self._reply(speculation, report, previous))
+
+    async def _reply(self, speculation: Speculation, report: dict, previous):
+        if previous:
+            # Answers go out in turn order
+            await asyncio.wait([previous])
+        try:
+            sent = await self._send_reply(speculation)
+            if report["hit"] and speculation.failed and not sent:
+                # The speculative call errored before producing anything: a miss after all
+                self.stats["hits"] -= 1
+                self.stats["misses"] += 1
+                self.stats["saved_ms"] -= report["saved_ms"]
+                report.update(hit=False, saved_ms=0.0,
+                              hit_rate=round(self.stats["hits"] / self.stats["turns"], 3))
+                speculation = Speculation(self.http, speculation.text)
+                await self._send_reply(speculation)
+            await self.websocket.send_json(report)
+        except Exception:
+            speculation.cancel()
+
+    async def _send_reply(self, speculation: Speculation) -> int:
+        sent = 0
+        async for chunk in speculation.stream():
+            await self.websocket.send_json({"type": "ai_response", "text": chunk})
+            sent += 1
+        return sent
+
+    def close(self):
+        for task in (self.timer, self.reply_task):
+            if task:
+                task.cancel()
+        if self.speculation:
+            self.speculation.cancel()
+        print("Speculation stats:", self.stats)
+
+
+class ForwardStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_out = 0
+
+    def report(self, copies: int) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            "mode": "binary" if ASSEMBLYAI_BINARY_AUDIO else "json",
+            "seconds": round(elapsed, 1),
+            "frames_out": self.frames_out,
+            "copies": copies,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_in_per_sec": round(self.bytes_in / elapsed),
+            "bytes_out_per_sec": round(self.bytes_out / elapsed),
+            "inflation": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
+
 # Serve frontend
 @app.get("/")
 async def get():
@@ -47,15 +291,36 @@ async def websocket_endpoint(websocket: WebSocket):
         ping_timeout=20
     ) as assembly_ws:
 
+        rechunker = FrameRechunker()
+        stats = ForwardStats()
+
+        async def send_frame(frame):
+            if ASSEMBLYAI_BINARY_AUDIO:
+                await assembly_ws.send(frame)
+                stats.bytes_out += len(frame)
+            else:
+                b64_audio = base64.b64encode(frame).decode("utf-8")
+                payload = json.dumps({"audio_data": b64_audio})
+                await assembly_ws.send(payload)
+                stats.bytes_out += len(payload)
+            stats.frames_out += 1
+
         async def receive_from_client():
             try:
                 while True:
                     data = await websocket.receive_bytes()
-                    b64_audio = base64.b64encode(data).decode("utf-8")
-                    payload = json.dumps({"audio_data": b64_audio})
-                    await assembly_ws.send(payload)
+                    stats.bytes_in += len(data)
+                    for frame in rechunker.push(data):
+                        await send_frame(frame)
             except Exception:
                 pass
+            finally:
+                try:
+                    for frame in rechunker.flush():
+                        await send_frame(frame)
+                except Exception:
+                    pass
+                print("Forwarding stats:", stats.report(rechunker.copies))
 
         async def receive_from_assemblyai():
             try:
@@ -64,20 +329,31 @@ async def websocket_endpoint(websocket: WebSocket):
 
                     # Handle transcription text
                     if "text" in msg_json and msg_json["text"].strip() != "":
+                        is_final = msg_json.get("message_type") == "FinalTranscript"
                         await websocket.send_json({
                             "type": "transcript",
                             "text": msg_json["text"],
-                            "is_final": msg_json.get("message_type") == "FinalTranscript"
+                            "is_final": is_final
                         })
+                        if is_final:
+                            responder.on_final(msg_json["text"])
+                        else:
+                            responder.on_partial(msg_json["text"])
 
                     # Handle turn end signal
                     if msg_json.get("message_type") == "TurnEnd":
                         await websocket.send_json({"type": "end_of_turn"})
+                        responder.on_turn_end()
             except Exception:
                 pass
 
         # Run both tasks concurrently
-        await asyncio.gather(receive_from_client(), receive_from_assemblyai())
+        async with httpx.AsyncClient(timeout=None) as http:
+            responder = SpeculativeResponder(websocket, http)
+            try:
+                await asyncio.gather(receive_from_client(), receive_from_assemblyai())
+            finally:
+                responder.close()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,81 @@
+"""Replay recorded sessions through the local end-of-turn detector.
+
+Record sessions by running the server with ENDPOINT_RECORD_DIR=recordings, then:
+
+    python bench_endpointing.py recordings
+
+Each upstream end_of_turn (stream position when AssemblyAI's event arrived) is paired
+with the latest local end that fired before it, within MATCH_WINDOW_MS. Reports how
+much earlier the local detector fires, plus false fires and misses, per silence setting.
+"""
+import glob
+import json
+import os
+import sys
+import time
+import wave
+
+from endpointing import EndOfTurnDetector
+
+SILENCE_SETTINGS_MS = [300, 400, 500, 700]
+MATCH_WINDOW_MS = 2000
+CHUNK_SAMPLES = 4096  # same buffer size the browser ScriptProcessor sends
+
+
+def load_session(wav_path: str):
+    with wave.open(wav_path, "rb") as wf:
+        pcm = wf.readframes(wf.getnframes())
+    events_path = wav_path[:-len(".wav")] + ".jsonl"
+    with open(events_path, "r", encoding="utf-8") as f:
+        upstream = [e["audio_ms"] for e in map(json.loads, f) if e["event"] == "upstream_end"]
+    return pcm, upstream
+
+
+def run_detector(pcm: bytes, silence_ms: int):
+    detector = EndOfTurnDetector(silence_ms=silence_ms)
+    ends = []
+    step = CHUNK_SAMPLES * 2
+    for i in range(0, len(pcm), step):
+        ends += detector.push(pcm[i:i + step])
+    return ends
+
+
+def score(local_ends, upstream_ends):
+    leads, used = [], set()
+    for up in upstream_ends:
+        candidates = [i for i, t in enumerate(local_ends)
+                      if i not in used and up - MATCH_WINDOW_MS <= t <= up]
+        if candidates:
+            i = candidates[-1]
+            used.add(i)
+            leads.append(up - local_ends[i])
+    return leads, len(local_ends) - len(used), len(upstream_ends) - len(leads)
+
+
+def main(record_dir: str):
+    sessions = [load_session(p) for p in sorted(glob.glob(os.path.join(record_dir, "*.wav")))]
+    if not sessions:
+        sys.exit(f"No recorded sessions in {record_dir}")
+    total_audio_s = sum(len(pcm) for pcm, _ in sessions) / 32000
+    print(f"{len(sessions)} sessions, {total_audio_s:.0f} s of audio, "
+          f"{sum(len(u) for _, u in sessions)} upstream turn ends")
+    print(f"{'silence ms':>10}{'matched':>9}{'avg lead ms':>13}{'p50 lead':>10}"
+          f"{'false fires':>13}{'misses':>8}{'x realtime':>12}")
+    for silence_ms in SILENCE_SETTINGS_MS:
+        leads, false_fires, misses = [], 0, 0
+        started = time.perf_counter()
+        for pcm, upstream in sessions:
+            l, f, m = score(run_detector(pcm, silence_ms), upstream)
+            leads += l
+            false_fires += f
+            misses += m
+        speed = total_audio_s / max(time.perf_counter() - started, 1e-9)
+        leads.sort()
+        avg = sum(leads) / len(leads) if leads else 0
+        p50 = leads[len(leads) // 2] if leads else 0
+        print(f"{silence_ms:>10}{len(leads):>9}{avg:>13.0f}{p50:>10.0f}"
+              f"{false_fires:>13}{misses:>8}{speed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "recordings")
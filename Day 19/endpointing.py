@@ -0,0 +1,67 @@
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+
+
+class EndOfTurnDetector:
+    """Local energy-based endpointing on 16 kHz 16-bit mono PCM.
+
+    Frames are scored in bulk with numpy: log energy against an adaptive noise floor,
+    plus zero-crossing rate to reject hiss. A turn ends once the user has spoken for at
+    least min_speech_ms and then stayed quiet for silence_ms.
+    """
+
+    def __init__(self, silence_ms: int = 500, min_speech_ms: int = 200, margin_db: float = 12.0,
+                 sample_rate: int = SAMPLE_RATE, frame_ms: int = FRAME_MS):
+        self.silence_ms = silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.margin_db = margin_db
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+
+        self.noise_db = None
+        self.speech_ms = 0
+        self.silence_run_ms = 0
+        self.in_speech = False
+        self.audio_ms = 0  # position in the stream, for benchmarking against upstream
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    def push(self, pcm: bytes) -> list:
+        """Feed PCM; returns the stream offsets (ms) where a turn ended in this chunk."""
+        samples = np.concatenate([self._pending, np.frombuffer(pcm, dtype=np.int16)])
+        n_frames = len(samples) // self.frame_samples
+        self._pending = samples[n_frames * self.frame_samples:]
+        if not n_frames:
+            return []
+
+        frames = samples[:n_frames * self.frame_samples].reshape(n_frames, self.frame_samples)
+        frames = frames.astype(np.float32)
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1.0)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        ends = []
+        for db, crossings in zip(energy_db, zcr):
+            if self.noise_db is None:
+                self.noise_db = db
+            is_speech = db > self.noise_db + self.margin_db and crossings < 0.5
+            if not is_speech:
+                # Track the noise floor only on non-speech frames (slow rise, fast fall)
+                rate = 0.05 if db > self.noise_db else 0.3
+                self.noise_db += rate * (db - self.noise_db)
+            self.audio_ms += self.frame_ms
+            if is_speech:
+                self.speech_ms += self.frame_ms
+                self.silence_run_ms = 0
+                if self.speech_ms >= self.min_speech_ms:
+                    self.in_speech = True
+            else:
+                self.silence_run_ms += self.frame_ms
+                if not self.in_speech and self.silence_run_ms >= self.silence_ms:
+                    self.speech_ms = 0  # short blip, not a turn
+                if self.in_speech and self.silence_run_ms >= self.silence_ms:
+                    ends.append(self.audio_ms)
+                    self.in_speech = False
+                    self.speech_ms = 0
+        return ends
@@ -1,12 +1,16 @@
 import os
+import re
+import json
+import time
+import wave
 import asyncio
-import threading
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 import assemblyai as aai
 import google.generativeai as genai
+from endpointing import EndOfTurnDetector
 from assemblyai.streaming.v3 import (
     StreamingClient, StreamingClientOptions,
     StreamingParameters, StreamingSessionParameters,
@@ -23,6 +27,25 @@ aai.settings.api_key = ASSEMBLYAI_API_KEY
 genai.configure(api_key=GEMINI_API_KEY)
 gemini_model = genai.GenerativeModel("gemini-1.5-flash")
 
+# Global cap on concurrent Gemini streams across all sessions
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+# Finished turns a session may queue while its previous answer is still streaming
+TURN_QUEUE_SIZE = int(os.getenv("TURN_QUEUE_SIZE", "4"))
+llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENT)
+
+# Pre-connected AssemblyAI sessions kept ready for new sockets
+STT_POOL_SIZE = int(os.getenv("STT_POOL_SIZE", "2"))
+# Idle upstream sessions are recycled before AssemblyAI's inactivity timeout
+STT_POOL_MAX_IDLE_SECONDS = float(os.getenv("STT_POOL_MAX_IDLE_SECONDS", "30"))
+# How often idle sessions are checked; ones this close to the limit are replaced early
+STT_POOL_CHECK_SECONDS = float(os.getenv("STT_POOL_CHECK_SECONDS", "5"))
+
+# Optional local endpointing that can end a turn before AssemblyAI's end_of_turn
+LOCAL_ENDPOINTING = os.getenv("LOCAL_ENDPOINTING", "false").lower() == "true"
+LOCAL_ENDPOINT_SILENCE_MS = int(os.getenv("LOCAL_ENDPOINT_SILENCE_MS", "500"))
+# When set, each session's PCM and upstream turn ends are saved for bench_endpointing.py
+ENDPOINT_RECORD_DIR = os.getenv("ENDPOINT_RECORD_DIR")
+
 # FastAPI app
 app = FastAPI()
 app.add_middleware(
@@ -39,58 +62,315 @@ async def get_index():
     return HTMLResponse(content=html_content)
 
 
-class AssemblyAIStreamingTranscriber:
-    def __init__(self, websocket: WebSocket, loop, sample_rate=16000):
-        self.websocket = websocket
-        self.loop = loop
+def words(text: str) -> list:
+    """Transcript words without case or punctuation, so the formatted final matches its partial."""
+    return re.findall(r"[\w']+", text.lower())
+
 
+class PooledStreamingConnection:
+    """A connected StreamingClient whose events go to whichever session owns it."""
+
+    def __init__(self, sample_rate: int):
+        self.owner = None
+        self.alive = True
         self.client = StreamingClient(
             StreamingClientOptions(
                 api_key=aai.settings.api_key,
                 api_host="streaming.assemblyai.com"
             )
         )
-        self.client.on(StreamingEvents.Begin, self.on_begin)
-        self.client.on(StreamingEvents.Turn, self.on_turn)
-        self.client.on(StreamingEvents.Termination, self.on_termination)
-        self.client.on(StreamingEvents.Error, self.on_error)
+        self.client.on(StreamingEvents.Begin, self.dispatch("on_begin"))
+        self.client.on(StreamingEvents.Turn, self.dispatch("on_turn"))
+        self.client.on(StreamingEvents.Termination, self.dispatch("on_termination"))
+        self.client.on(StreamingEvents.Error, self.dispatch("on_error"))
 
+        started = time.perf_counter()
         self.client.connect(
             StreamingParameters(sample_rate=sample_rate, format_turns=True)
         )
+        self.connect_ms = (time.perf_counter() - started) * 1000
+        self.connected_at = time.monotonic()
+
+    def dispatch(self, name: str):
+        def handler(client, event):
+            if name in ("on_termination", "on_error"):
+                self.alive = False
+            if self.owner is not None:
+                getattr(self.owner, name)(client, event)
+        return handler
+
+    def disconnect(self):
+        self.client.disconnect(terminate=True)
+
+
+class StreamingConnectionPool:
+    """Keeps STT_POOL_SIZE AssemblyAI sessions connected and refills in the background."""
+
+    def __init__(self, size: int, sample_rate: int = 16000):
+        self.size = size
+        self.sample_rate = sample_rate
+        self.idle = []
+        self.connecting = 0
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self.connect_ms = []
+        self.maintainer = None
+
+    async def connect(self) -> PooledStreamingConnection:
+        # connect() blocks on the upstream handshake, keep it off the event loop
+        connection = await asyncio.to_thread(PooledStreamingConnection, self.sample_rate)
+        self.connect_ms = (self.connect_ms + [connection.connect_ms])[-100:]
+        return connection
+
+    def refill(self):
+        missing = self.size - len(self.idle) - self.connecting
+        for _ in range(max(0, missing)):
+            self.connecting += 1
+            asyncio.create_task(self._add_one())
+
+    async def _add_one(self):
+        try:
+            self.idle.append(await self.connect())
+        except Exception as e:
+            print("❌ STT pool connect failed:", e)
+        finally:
+            self.connecting -= 1
+
+    def start(self):
+        self.refill()
+        self.maintainer = asyncio.create_task(self.maintain())
+
+    async def maintain(self):
+        # Without this an idle pool only notices expiry on acquire, so after a quiet
+        # spell every hit has gone stale and the next socket pays for a fresh connect
+        while True:
+            await asyncio.sleep(STT_POOL_CHECK_SECONDS)
+            cutoff = time.monotonic() - (STT_POOL_MAX_IDLE_SECONDS - STT_POOL_CHECK_SECONDS)
+            stale = [c for c in self.idle if not c.alive or c.connected_at <= cutoff]
+            if not stale:
+                continue
+            self.idle = [c for c in self.idle if c not in stale]
+            self.recycled += len(stale)
+            self.refill()
+            for connection in stale:
+                asyncio.create_task(asyncio.to_thread(connection.disconnect))
+
+    async def acquire(self) -> PooledStreamingConnection:
+        now = time.monotonic()
+        while self.idle:
+            connection = self.idle.pop(0)
+            if connection.alive and now - connection.connected_at < STT_POOL_MAX_IDLE_SECONDS:
+                self.hits += 1
+                self.refill()
+                return connection
+            asyncio.create_task(asyncio.to_thread(connection.disconnect))
+        self.misses += 1
+        self.refill()
+        return await self.connect()
+
+    def metrics(self) -> dict:
+        total = self.hits + self.misses
+        samples = sorted(self.connect_ms)
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "connecting": self.connecting,
+            "hits": self.hits,
+            "misses": self.misses,
+            "recycled": self.recycled,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "connect_ms_avg": round(sum(samples) / len(samples), 1) if samples else None,
+            "connect_ms_p95": round(samples[int(len(samples) * 0.95)], 1) if samples else None,
+        }
+
+    async def close(self):
+        if self.maintainer:
+            self.maintainer.cancel()
+        idle, self.idle = self.idle, []
+        await asyncio.gather(*(asyncio.to_thread(c.disconnect) for c in idle), return_exceptions=True)
+
+
+stt_pool = StreamingConnectionPool(STT_POOL_SIZE)
+
+
+@app.on_event("startup")
+async def warm_stt_pool():
+    stt_pool.start()
+
+
+@app.on_event("shutdown")
+async def drain_stt_pool():
+    await stt_pool.close()
+
+
+@app.get("/metrics/stt-pool")
+async def stt_pool_metrics():
+    return stt_pool.metrics()
+
+
+class AssemblyAIStreamingTranscriber:
+    def __init__(self, websocket: WebSocket, loop, connection: PooledStreamingConnection):
+        self.websocket = websocket
+        self.loop = loop
+        # One worker per session drains finished turns in order
+        self.turns = asyncio.Queue(maxsize=TURN_QUEUE_SIZE)
+        self.worker = loop.create_task(self.run_turns())
+        # In-flight answer, cancelled when the user starts speaking again
+        self.reply_task = None
+        self.reply_turn = None  # (turn_order, text) being answered
+        self.reply_chars = 0
+        self.interruptions = 0
+
+        # Upstream session was connected ahead of time by the pool
+        self.connection = connection
+        self.client = connection.client
+        connection.owner = self
+
+        # Turn bookkeeping shared by upstream and local endpointing
+        self.latest_partial = ""
+        self.current_turn_order = None
+        self.answered_turn_order = None
+        self.local_end_at = None
+        self.local_turn = None  # (turn_order, text) answered on a local end
+        self.retracted_turn = None  # local answer still queued when upstream overruled it
+        self.audio_bytes = 0
+        self.endpoint_stats = {"local_ends": 0, "upstream_ends": 0, "false_fires": 0, "local_lead_ms": []}
+        self.detector = EndOfTurnDetector(silence_ms=LOCAL_ENDPOINT_SILENCE_MS) if LOCAL_ENDPOINTING else None
+        self.recording = None
+        if ENDPOINT_RECORD_DIR:
+            os.makedirs(ENDPOINT_RECORD_DIR, exist_ok=True)
+            name = os.path.join(ENDPOINT_RECORD_DIR, f"session_{int(time.time() * 1000)}")
+            self.recording = wave.open(name + ".wav", "wb")
+            self.recording.setnchannels(1)
+            self.recording.setsampwidth(2)
+            self.recording.setframerate(16000)
+            self.recording_events = open(name + ".jsonl", "w", encoding="utf-8")
 
     def on_begin(self, client, event: BeginEvent):
         print(f"🎤 Session started: {event.id}")
 
     def on_turn(self, client, event: TurnEvent):
-        if event.end_of_turn and event.transcript.strip():
-            user_text = event.transcript
+        # Called on the SDK thread: hand the turn to the event loop and return
+        if not event.transcript.strip():
+            return
+        self.loop.call_soon_threadsafe(
+            self.handle_turn, event.transcript, event.end_of_turn, event.turn_order
+        )
+
+    def handle_turn(self, transcript: str, end_of_turn: bool, turn_order: int):
+        if not end_of_turn:
+            self.latest_partial = transcript
+            self.current_turn_order = turn_order
+            # Trailing partials of a turn we already answered are not new speech
+            if turn_order != self.answered_turn_order:
+                # Partial transcript means the user is talking over the answer
+                self.barge_in()
+            return
+
+        if turn_order == self.answered_turn_order:
+            # Already answered: either the local detector won or this is the formatted repeat
+            if self.local_end_at is not None:
+                self.log_upstream_end()
+                if words(transcript) != words(self.local_turn[1]):
+                    # The user kept talking after the local end: answer the full turn instead
+                    self.endpoint_stats["false_fires"] += 1
+                    self.retract_local_answer()
+                    self.enqueue_turn(turn_order, transcript)
+                else:
+                    lead_ms = (time.monotonic() - self.local_end_at) * 1000
+                    self.endpoint_stats["local_lead_ms"].append(round(lead_ms, 1))
+                self.local_end_at = None
+                self.local_turn = None
+            return
+        self.log_upstream_end()
+        self.answered_turn_order = turn_order
+        self.latest_partial = ""
+        self.enqueue_turn(turn_order, transcript)
+
+    def on_local_end(self, audio_ms: int):
+        self.endpoint_stats["local_ends"] += 1
+        if self.recording:
+            self.recording_events.write(json.dumps({"event": "local_end", "audio_ms": audio_ms}) + "\n")
+        if not self.latest_partial or self.current_turn_order == self.answered_turn_order:
+            return
+        # Answer from the latest partial now instead of waiting for AssemblyAI
+        self.answered_turn_order = self.current_turn_order
+        self.local_end_at = time.monotonic()
+        self.local_turn = (self.current_turn_order, self.latest_partial)
+        self.latest_partial = ""
+        self.enqueue_turn(*self.local_turn)
+
+    def retract_local_answer(self):
+        if self.reply_turn != self.local_turn:
+            self.retracted_turn = self.local_turn  # still queued: skip it when dequeued
+        elif not self.reply_task.done():
+            self.reply_task.cancel()
+            self.loop.create_task(self.websocket.send_json({
+                "type": "interrupt",
+                "generated_chars": self.reply_chars,
+            }))
+
+    def log_upstream_end(self):
+        self.endpoint_stats["upstream_ends"] += 1
+        if self.recording:
+            audio_ms = self.audio_bytes * 1000 // (16000 * 2)
+            self.recording_events.write(json.dumps({"event": "upstream_end", "audio_ms": audio_ms}) + "\n")
+
+    def barge_in(self):
+        if self.reply_task is None or self.reply_task.done():
+            return
+        self.reply_task.cancel()
+        self.interruptions += 1
+        print(f"\n✋ Barge-in: cancelled answer after {self.reply_chars} chars "
+              f"({self.interruptions} interruptions this session)")
+        self.loop.create_task(self.websocket.send_json({
+            "type": "interrupt",
+            "generated_chars": self.reply_chars,
+        }))
+
+    def enqueue_turn(self, turn_order: int, user_text: str):
+        try:
+            self.turns.put_nowait((turn_order, user_text))
+        except asyncio.QueueFull:
+            print("⚠️ Turn queue full, dropping turn:", user_text)
+
+    async def run_turns(self):
+        while True:
+            turn = await self.turns.get()
+            user_text = turn[1]
 
             # Print user speech in VS Code terminal
             print("\nUser:", user_text)
 
             # Send transcript to frontend
-            asyncio.run_coroutine_threadsafe(
-                self.websocket.send_json({"type": "transcript", "text": user_text}),
-                self.loop
-            )
+            await self.websocket.send_json({"type": "transcript", "text": user_text})
 
-            # Stream LLM response
-            def run_llm_stream():
-                try:
-                    for chunk in gemini_model.generate_content(user_text, stream=True):
-                        if chunk.text:
-                            # Print LLM response in VS Code terminal
-                            print("LLM:", chunk.text, end="", flush=True)
-                            # Send LLM response to frontend
-                            asyncio.run_coroutine_threadsafe(
-                                self.websocket.send_json({"type": "ai_response", "text": chunk.text}),
-                                self.loop
-                            )
-                except Exception as e:
-                    print("⚠️ Gemini streaming error:", e)
-
-            threading.Thread(target=run_llm_stream, daemon=True).start()
+            if turn == self.retracted_turn:
+                # Local end fired early; the full upstream turn is queued behind this one
+                self.retracted_turn = None
+                continue
+
+            # Run the answer as its own task so barge-in can cancel it mid-stream
+            self.reply_turn = turn
+            self.reply_task = asyncio.create_task(self.reply(user_text))
+            await asyncio.wait([self.reply_task])
+
+    async def reply(self, user_text: str):
+        self.reply_chars = 0
+        # Stream LLM response, awaiting each send so chunks arrive in order
+        try:
+            async with llm_slots:
+                response = await gemini_model.generate_content_async(user_text, stream=True)
+                async for chunk in response:
+                    if chunk.text:
+                        self.reply_chars += len(chunk.text)
+                        # Print LLM response in VS Code terminal
+                        print("LLM:", chunk.text, end="", flush=True)
+                        # Send LLM response to frontend
+                        await self.websocket.send_json({"type": "ai_response", "text": chunk.text})
+        except Exception as e:
+            print("⚠️ Gemini streaming error:", e)
 
     def on_termination(self, client, event: TerminationEvent):
         print(f"\n🛑 Session terminated after {event.audio_duration_seconds} s")
@@ -100,16 +380,34 @@ class AssemblyAIStreamingTranscriber:
 
     def stream_audio(self, audio_chunk: bytes):
         self.client.stream(audio_chunk)
+        self.audio_bytes += len(audio_chunk)
+        if self.recording:
+            self.recording.writeframes(audio_chunk)
+        if self.detector:
+            for audio_ms in self.detector.push(audio_chunk):
+                self.on_local_end(audio_ms)
 
-    def close(self):
-        self.client.disconnect(terminate=True)
+    async def close(self):
+        self.worker.cancel()
+        if self.reply_task:
+            self.reply_task.cancel()
+        if self.recording:
+            self.recording.close()
+            self.recording_events.close()
+        leads = self.endpoint_stats["local_lead_ms"]
+        if leads:
+            print(f"Local endpointing beat upstream on {len(leads)} turns, "
+                  f"avg {sum(leads) / len(leads):.0f} ms earlier")
+        if self.endpoint_stats["false_fires"]:
+            print(f"Local endpointing fired early on {self.endpoint_stats['false_fires']} turns")
+        await asyncio.to_thread(self.connection.disconnect)
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    loop = asyncio.get_event_loop()
-    transcriber = AssemblyAIStreamingTranscriber(websocket, loop)
+    loop = asyncio.get_running_loop()
+    transcriber = AssemblyAIStreamingTranscriber(websocket, loop, await stt_pool.acquire())
 
     try:
         while True:
@@ -117,4 +415,4 @@ async def websocket_endpoint(websocket: WebSocket):
             transcriber.stream_audio(data)
     except WebSocketDisconnect:
         print("Client disconnected")
-        transcriber.close()
+        await transcriber.close()
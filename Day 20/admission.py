@@ -0,0 +1,110 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+_PRIORITY = {INTERACTIVE: 0, BATCH: 1}
+WAIT_SAMPLES = 1000  # recent waits kept per class for percentiles
+
+
+class _ClassStats:
+    def __init__(self):
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.waits_ms = deque(maxlen=WAIT_SAMPLES)
+
+    def report(self, in_flight: int) -> dict:
+        waits = sorted(self.waits_ms)
+        return {
+            "in_flight": in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+            "wait_ms_max": round(waits[-1], 1) if waits else 0.0,
+        }
+
+
+class AdmissionScheduler:
+    """Priority admission in front of a provider's concurrency limit.
+
+    Interactive callers are always served before batch callers, and batch work may
+    hold at most capacity - interactive_reserve slots, so a live conversation never
+    waits behind a full house of batch requests. Within a class, callers are FIFO.
+    """
+
+    def __init__(self, capacity: int, interactive_reserve: int = 1):
+        self.capacity = capacity
+        self.batch_limit = max(capacity - interactive_reserve, 1)
+        self._in_flight = {kind: 0 for kind in _PRIORITY}
+        self._waiting = []  # heap of (priority, seq, kind, future)
+        self._seq = itertools.count()
+        self._stats = {kind: _ClassStats() for kind in _PRIORITY}
+
+    @asynccontextmanager
+    async def slot(self, kind: str):
+        """Hold one provider slot for the body of the block; yields the queueing delay in ms."""
+        waited_ms = await self._acquire(kind)
+        try:
+            yield waited_ms
+        finally:
+            self._release(kind)
+
+    def report(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "batch_limit": self.batch_limit,
+            "classes": {kind: stats.report(self._in_flight[kind]) for kind, stats in self._stats.items()},
+        }
+
+    def _can_admit(self, kind: str) -> bool:
+        if sum(self._in_flight.values()) >= self.capacity:
+            return False
+        return kind != BATCH or self._in_flight[BATCH] < self.batch_limit
+
+    def _ahead_of(self, kind: str) -> bool:
+        priority = _PRIORITY[kind]
+        return any(p <= priority and not fut.done() for p, _, _, fut in self._waiting)
+
+    async def _acquire(self, kind: str) -> float:
+        stats = self._stats[kind]
+        start = time.perf_counter()
+        if self._can_admit(kind) and not self._ahead_of(kind):
+            self._in_flight[kind] += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (_PRIORITY[kind], next(self._seq), kind, fut))
+            stats.queued += 1
+            stats.max_queued = max(stats.max_queued, stats.queued)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                # Granted just before the caller went away: hand the slot on
+                if fut.done() and not fut.cancelled():
+                    self._release(kind)
+                raise
+            finally:
+                stats.queued -= 1
+        waited_ms = (time.perf_counter() - start) * 1000
+        stats.admitted += 1
+        stats.waits_ms.append(waited_ms)
+        return waited_ms
+
+    def _release(self, kind: str):
+        self._in_flight[kind] -= 1
+        while self._waiting:
+            _, _, next_kind, fut = self._waiting[0]
+            if fut.done():  # cancelled while queued
+                heapq.heappop(self._waiting)
+                continue
+            if not self._can_admit(next_kind):
+                break
+            heapq.heappop(self._waiting)
+            self._in_flight[next_kind] += 1
+            fut.set_result(None)
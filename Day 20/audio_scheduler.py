@@ -0,0 +1,132 @@
+import asyncio
+import io
+import time
+import wave
+
+
+def audio_duration_ms(audio_bytes: bytes, sample_rate: int = 44100, sample_width: int = 2,
+                      channels: int = 1) -> float:
+    """Playback length of a WAV chunk, or of headerless PCM in the given format."""
+    if audio_bytes[:4] == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(audio_bytes)) as wf:
+                return wf.getnframes() * 1000 / wf.getframerate()
+        except (wave.Error, EOFError):
+            pass
+    return len(audio_bytes) / (sample_width * channels) * 1000 / sample_rate
+
+
+class PacedAudioSender:
+    """Per-connection outbound audio scheduler with a small jitter buffer.
+
+    Frames are released in real time so the client never holds more than lead_ms of
+    audio ahead of its playhead. Playback starts (and restarts after an underrun) only
+    once prebuffer_ms is queued, which absorbs bursty upstream delivery. The queue is
+    capped at max_buffer_ms; producers wait when it is full.
+    """
+
+    def __init__(self, send, lead_ms: float = 250, prebuffer_ms: float = 150,
+                 max_buffer_ms: float = 3000):
+        self.send = send
+        self.lead_ms = lead_ms
+        self.prebuffer_ms = prebuffer_ms
+        self.max_buffer_ms = max_buffer_ms
+
+        self._frames = asyncio.Queue()
+        self._buffered_ms = 0.0
+        self._space = asyncio.Condition()
+        self._playhead_start = None  # wall clock (ms) matching sent audio position 0
+        self._sent_ms = 0.0
+        self._stream_closed = False  # set by end_of_stream(), cleared by the next put()
+        self._generation = 0  # bumped by flush(); a frame taken before that is stale
+
+        self.frames_sent = 0
+        self.underruns = 0
+        self.overruns = 0
+        self.max_lead_ms = 0.0
+
+    async def put(self, message, duration_ms: float):
+        async with self._space:
+            if self._buffered_ms + duration_ms > self.max_buffer_ms:
+                self.overruns += 1
+                await self._space.wait_for(
+                    lambda: self._buffered_ms + duration_ms <= self.max_buffer_ms or self._buffered_ms == 0
+                )
+            self._buffered_ms += duration_ms
+        self._stream_closed = False
+        self._frames.put_nowait((message, duration_ms))
+
+    def end_of_stream(self):
+        """Release whatever is buffered even if it is shorter than the prebuffer."""
+        self._stream_closed = True
+
+    def flush(self):
+        """Drop queued audio (barge-in); the next frame starts a fresh playhead."""
+        self._generation += 1
+        while not self._frames.empty():
+            self._frames.get_nowait()
+        self._buffered_ms = 0.0
+        self._playhead_start = None
+        self._sent_ms = 0.0
+        asyncio.create_task(self._notify_space())
+
+    async def _notify_space(self):
+        async with self._space:
+            self._space.notify_all()
+
+    def _now(self) -> float:
+        return time.perf_counter() * 1000
+
+    async def run(self):
+        while True:
+            message, duration_ms = await self._next_frame()
+            generation = self._generation
+            if self._playhead_start is not None and self._now() - self._playhead_start > self._sent_ms:
+                # Client already played everything we sent: resync the playhead
+                self._playhead_start = None
+            if self._playhead_start is None:
+                await self._prebuffer()
+                self._playhead_start = self._now()
+                self._sent_ms = 0.0
+
+            lead = self._sent_ms - (self._now() - self._playhead_start)
+            if lead + duration_ms > self.lead_ms:
+                await asyncio.sleep((lead + duration_ms - self.lead_ms) / 1000)
+            if generation != self._generation:
+                continue  # flushed while we held it: never send audio after an interrupt
+            await self.send(message)
+
+            self.frames_sent += 1
+            self._sent_ms += duration_ms
+            self.max_lead_ms = max(self.max_lead_ms, self._sent_ms - (self._now() - self._playhead_start))
+            async with self._space:
+                self._buffered_ms = max(0.0, self._buffered_ms - duration_ms)
+                self._space.notify_all()
+
+    async def _next_frame(self):
+        if self._playhead_start is None or self._stream_closed:
+            return await self._frames.get()
+        remaining_ms = self._sent_ms - (self._now() - self._playhead_start)
+        try:
+            return await asyncio.wait_for(self._frames.get(), timeout=max(remaining_ms, 0) / 1000)
+        except asyncio.TimeoutError:
+            # Client ran out of audio mid-stream while upstream was still producing
+            if not self._stream_closed:
+                self.underruns += 1
+            return await self._frames.get()
+
+    async def _prebuffer(self):
+        # _buffered_ms still counts the frame we are holding
+        deadline = self._now() + self.prebuffer_ms * 4
+        while (self._buffered_ms < self.prebuffer_ms and not self._stream_closed
+               and self._now() < deadline):
+            await asyncio.sleep(0.01)
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "buffered_ms": round(self._buffered_ms, 1),
+            "max_lead_ms": round(self.max_lead_ms, 1),
+        }
@@ -0,0 +1,79 @@
+"""Simulated provider contention: live turns vs a burst of batch requests.
+
+A provider with a fixed concurrency limit serves interactive turns (short calls,
+arriving steadily) while batch callers keep it saturated with longer calls. Compares
+a plain FIFO semaphore with AdmissionScheduler and reports queueing delay per class.
+
+    python bench_admission.py
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+
+from admission import BATCH, INTERACTIVE, AdmissionScheduler
+
+CAPACITY = 4
+BATCH_WORKERS = 12
+BATCH_CALL_S = 0.20
+INTERACTIVE_TURNS = 100
+INTERACTIVE_GAP_S = 0.03
+INTERACTIVE_CALL_S = 0.05
+
+
+class FifoSlots:
+    """Baseline: one shared semaphore, first come first served."""
+
+    def __init__(self, capacity: int):
+        self._sem = asyncio.Semaphore(capacity)
+
+    @asynccontextmanager
+    async def slot(self, kind: str):
+        start = asyncio.get_running_loop().time()
+        async with self._sem:
+            yield (asyncio.get_running_loop().time() - start) * 1000
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run(slots) -> dict:
+    waits = {INTERACTIVE: [], BATCH: []}
+    stop = asyncio.Event()
+
+    async def batch_worker():
+        while not stop.is_set():
+            async with slots.slot(BATCH) as waited_ms:
+                waits[BATCH].append(waited_ms)
+                await asyncio.sleep(BATCH_CALL_S * random.uniform(0.5, 1.5))
+
+    async def interactive_turn():
+        async with slots.slot(INTERACTIVE) as waited_ms:
+            waits[INTERACTIVE].append(waited_ms)
+            await asyncio.sleep(INTERACTIVE_CALL_S * random.uniform(0.5, 1.5))
+
+    workers = [asyncio.create_task(batch_worker()) for _ in range(BATCH_WORKERS)]
+    turns = []
+    for _ in range(INTERACTIVE_TURNS):
+        turns.append(asyncio.create_task(interactive_turn()))
+        await asyncio.sleep(INTERACTIVE_GAP_S)
+    await asyncio.gather(*turns)
+    stop.set()
+    await asyncio.gather(*workers)
+    return waits
+
+
+def main():
+    random.seed(7)
+    print(f"{'scheduler':>10}{'class':>13}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, factory in [("fifo", lambda: FifoSlots(CAPACITY)),
+                          ("priority", lambda: AdmissionScheduler(CAPACITY, interactive_reserve=1))]:
+        waits = asyncio.run(run(factory()))
+        for kind in (INTERACTIVE, BATCH):
+            print(f"{name:>10}{kind:>13}{len(waits[kind]):>7}"
+                  f"{percentile(waits[kind], 0.5):>9.1f}{percentile(waits[kind], 0.95):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Offline benchmark: TTS chunking strategies for streamed LLM text.
+
+Replays a few answers as random-sized LLM fragments and models each TTS call as a
+fixed round-trip overhead plus a per-character synthesis cost. Reports time to first
+audio and the number of synthesis calls per strategy.
+
+    python bench_chunker.py
+"""
+import random
+import re
+
+from chunker import AdaptiveChunker
+
+LLM_CHARS_PER_SECOND = 60.0
+TTS_CALL_OVERHEAD_MS = 180.0
+TTS_MS_PER_CHAR = 1.5
+RUNS = 200
+
+ANSWERS = [
+    "Sure! The capital of France is Paris, which is also its largest city. It sits on the "
+    "Seine river, and it has been a major centre of finance, diplomacy, commerce and culture "
+    "for centuries. Would you like to know more about its history, or perhaps its museums?",
+    "I can help with that. First, open the settings page and choose Accounts. Then select "
+    "the profile you want to change, update the email address, and press save. You should "
+    "receive a confirmation message within a few minutes.",
+    "Okay.",
+    "Great question: photosynthesis is the process plants use to turn light, water and carbon "
+    "dioxide into sugar and oxygen. It happens mostly in the leaves, inside tiny structures "
+    "called chloroplasts, which contain the green pigment chlorophyll.",
+]
+
+
+def fragments(text: str, rng: random.Random):
+    """Yield (arrival_ms, fragment) like a streaming LLM would."""
+    i, t = 0, 0.0
+    while i < len(text):
+        n = rng.randint(1, 12)
+        t += n / LLM_CHARS_PER_SECOND * 1000
+        yield t, text[i:i + n]
+        i += n
+
+
+def raw_fragments(stream):
+    # Day 19 style: every chunk.text goes straight to TTS
+    return [(t, frag) for t, frag in stream if frag.strip()]
+
+
+def sentences(stream):
+    out, buf = [], ""
+    for t, frag in stream:
+        buf += frag
+        while (m := re.search(r"[.!?]\s", buf)):
+            out.append((t, buf[:m.end()]))
+            buf = buf[m.end():]
+    if buf.strip():
+        out.append((t, buf))
+    return out
+
+
+def adaptive(target_latency_ms):
+    def run(stream):
+        chunker = AdaptiveChunker.for_latency(target_latency_ms, LLM_CHARS_PER_SECOND)
+        out = []
+        for t, frag in stream:
+            out += [(t, seg) for seg in chunker.feed(frag)]
+        out += [(t, seg) for seg in chunker.flush()]
+        return out
+    return run
+
+
+def simulate(segments):
+    """Sequential TTS calls on one stream; returns (time_to_first_audio_ms, done_ms, calls)."""
+    busy_until = 0.0
+    first_audio = None
+    for emitted_at, segment in segments:
+        start = max(emitted_at, busy_until)
+        busy_until = start + TTS_CALL_OVERHEAD_MS + TTS_MS_PER_CHAR * len(segment)
+        if first_audio is None:
+            first_audio = busy_until
+    return first_audio, busy_until, len(segments)
+
+
+def main():
+    strategies = {
+        "raw fragments": raw_fragments,
+        "sentences": sentences,
+        "adaptive 150ms": adaptive(150),
+        "adaptive 300ms": adaptive(300),
+        "adaptive 600ms": adaptive(600),
+    }
+    print(f"{'strategy':<16}{'ttfa p50 ms':>12}{'ttfa p95 ms':>12}{'calls/answer':>14}{'done p50 ms':>12}")
+    for name, strategy in strategies.items():
+        rng = random.Random(42)
+        ttfa, calls, done = [], [], []
+        for _ in range(RUNS):
+            for answer in ANSWERS:
+                segments = strategy(list(fragments(answer, rng)))
+                first, finished, n = simulate(segments)
+                ttfa.append(first)
+                done.append(finished)
+                calls.append(n)
+        ttfa.sort()
+        done.sort()
+        print(f"{name:<16}{ttfa[len(ttfa) // 2]:>12.0f}{ttfa[int(len(ttfa) * 0.95)]:>12.0f}"
+              f"{sum(calls) / len(calls):>14.1f}{done[len(done) // 2]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
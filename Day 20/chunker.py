@@ -0,0 +1,69 @@
+import re
+
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s")
+CLAUSE_END = re.compile(r"[,;:—-]\s")
+WORD_END = re.compile(r"\s")
+
+
+class AdaptiveChunker:
+    """Turns arbitrary LLM fragments into TTS-sized segments.
+
+    The first segment is cut as soon as a few words are available so audio can start
+    early. Later segments grow geometrically and prefer sentence, then clause, then
+    word boundaries, so the TTS gets fewer, more natural calls. Segments keep their
+    whitespace, so joining them gives back the original text.
+    """
+
+    def __init__(self, first_chars: int = 24, max_chars: int = 240, growth: float = 2.0):
+        self.first_chars = first_chars
+        self.max_chars = max_chars
+        self.growth = growth
+        self.target = first_chars
+        self.segments = 0
+        self._buffer = ""
+
+    @classmethod
+    def for_latency(cls, target_latency_ms: float, llm_chars_per_second: float = 60.0,
+                    max_chars: int = 240):
+        """Size the first segment to what the LLM produces within the latency budget."""
+        first_chars = int(llm_chars_per_second * target_latency_ms / 1000)
+        return cls(first_chars=max(8, min(first_chars, max_chars)), max_chars=max_chars)
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        segments = []
+        while (segment := self._next_segment()) is not None:
+            segments.append(segment)
+        return segments
+
+    def flush(self) -> list:
+        segment, self._buffer = self._buffer, ""
+        return [segment] if segment.strip() else []
+
+    def _next_segment(self):
+        if len(self._buffer) < self.target:
+            return None
+        cut = self._cut_point()
+        if cut is None:
+            return None
+        segment = self._buffer[:cut]
+        if not segment.strip():
+            return None
+        self._buffer = self._buffer[cut:]
+        self.segments += 1
+        self.target = min(int(self.target * self.growth), self.max_chars)
+        return segment
+
+    def _cut_point(self):
+        # The first segment stays near its target; later ones may run up to max_chars
+        limit = self.target if self.segments == 0 else self.max_chars
+        shortest = self.target // 2
+        for pattern in (SENTENCE_END, CLAUSE_END, WORD_END):
+            ends = [m.end() for m in pattern.finditer(self._buffer, 0, limit + 1)]
+            ends = [e for e in ends if e >= shortest]
+            if ends:
+                return ends[-1]
+        if len(self._buffer) >= self.max_chars:
+            # One very long word: hard cut rather than grow without bound
+            return self.max_chars
+        return None
@@ -1,20 +1,79 @@
 import os
 import asyncio
-import json
-import websockets
+import base64
+import math
+import struct
+import uuid
+from array import array
+from collections import deque
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
+from pydantic import BaseModel
 from dotenv import load_dotenv
+import google.generativeai as genai
+import requests
 import uvicorn
 
+from admission import BATCH, INTERACTIVE, AdmissionScheduler
+from audio_scheduler import PacedAudioSender, audio_duration_ms
+from chunker import AdaptiveChunker
+from murf_stream import MurfStreamClient
+from pipeline import VoicePipeline
+
 # Load environment variables
 load_dotenv()
 MURF_API_KEY = os.getenv("MURF_API_KEY")
-MURF_WS_URL = (
-    f"wss://api.murf.ai/v1/speech/stream-input?api-key={MURF_API_KEY}"
-    f"&sample_rate=44100&channel_type=MONO&format=WAV"
-)
+# Output rates a client may ask for with ?out_rate=; 44.1 kHz WAV is ~700 kbps, 16 kHz ~256 kbps
+MURF_SAMPLE_RATES = (8000, 16000, 24000, 44100, 48000)
+MURF_DEFAULT_SAMPLE_RATE = 44100
+
+def murf_ws_url(sample_rate: int = MURF_DEFAULT_SAMPLE_RATE) -> str:
+    return (
+        f"wss://api.murf.ai/v1/speech/stream-input?api-key={MURF_API_KEY}"
+        f"&sample_rate={sample_rate}&channel_type=MONO&format=WAV"
+    )
+
+def negotiate_output_rate(websocket: WebSocket) -> int:
+    requested = websocket.query_params.get("out_rate")
+    if not requested or not requested.isdigit():
+        return MURF_DEFAULT_SAMPLE_RATE
+    # Nearest supported rate that does not exceed the request
+    allowed = [rate for rate in MURF_SAMPLE_RATES if rate <= int(requested)] or [MURF_SAMPLE_RATES[0]]
+    return allowed[-1]
+
+MURF_VOICE_ID = os.getenv("MURF_VOICE_ID", "en-US-natalie")
+MURF_REST_URL = "https://api.murf.ai/v1/speech/generate"
+ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+genai.configure(api_key=GEMINI_API_KEY)
+gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+
+# Barge-in: sustained mic energy above this RMS (16-bit scale) counts as new speech
+BARGE_IN_RMS = int(os.getenv("BARGE_IN_RMS", "1500"))
+BARGE_IN_MS = int(os.getenv("BARGE_IN_MS", "200"))
+CLIENT_SAMPLE_RATE = 44100
+# Mic PCM rates /ws/agent accepts with ?sample_rate= (AssemblyAI streaming input rates)
+STT_SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+
+# Latency budget for the first TTS segment; later segments grow to full sentences
+TTS_FIRST_SEGMENT_MS = int(os.getenv("TTS_FIRST_SEGMENT_MS", "250"))
+
+# Audio chunks kept server-side per connection (oldest dropped first)
+AUDIO_RETENTION_CHUNKS = int(os.getenv("AUDIO_RETENTION_CHUNKS", "32"))
+# Outbound pacing: audio the client may hold ahead of its playhead, and jitter prebuffer
+PLAYBACK_LEAD_MS = int(os.getenv("PLAYBACK_LEAD_MS", "250"))
+JITTER_PREBUFFER_MS = int(os.getenv("JITTER_PREBUFFER_MS", "150"))
+# Binary mode frame: little-endian uint32 sequence number, then the WAV bytes
+FRAME_HEADER = struct.Struct("<I")
+
+# Provider admission: live sockets are served first, batch HTTP calls use spare slots
+MURF_CONCURRENCY = int(os.getenv("MURF_CONCURRENCY", "4"))
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+INTERACTIVE_RESERVED_SLOTS = int(os.getenv("INTERACTIVE_RESERVED_SLOTS", "1"))
+murf_slots = AdmissionScheduler(MURF_CONCURRENCY, INTERACTIVE_RESERVED_SLOTS)
+gemini_slots = AdmissionScheduler(GEMINI_CONCURRENCY, INTERACTIVE_RESERVED_SLOTS)
 
 # Create FastAPI app
 app = FastAPI()
@@ -35,6 +94,35 @@ async def index():
         html_content = f.read()
     return HTMLResponse(content=html_content, status_code=200)
 
+# Queue depth and wait time per traffic class, per provider
+@app.get("/metrics/admission")
+async def admission_metrics():
+    return {"murf": murf_slots.report(), "gemini": gemini_slots.report()}
+
+# Text model for batch TTS
+class TextPayload(BaseModel):
+    text: str
+    voice_id: str = MURF_VOICE_ID
+
+# One-shot Murf synthesis; batch class, so it only runs on capacity live sockets leave free
+@app.post("/generate-voice")
+async def generate_voice(payload: TextPayload):
+    headers = {"api-key": MURF_API_KEY, "Content-Type": "application/json"}
+    body = {"text": payload.text, "voiceId": payload.voice_id}
+    async with murf_slots.slot(BATCH) as queued_ms:
+        response = await asyncio.to_thread(requests.post, MURF_REST_URL, headers=headers, json=body, timeout=30)
+    if response.status_code == 200:
+        return {
+            "message": "Voice generated successfully",
+            "data": response.json(),
+            "queued_ms": round(queued_ms, 1)
+        }
+    return {
+        "error": "Failed to generate audio",
+        "status_code": response.status_code,
+        "details": response.text
+    }
+
 # Simulated LLM streaming generator
 async def stream_llm_response():
     responses = ["Hello,", " this is a streaming", " LLM response.", " Enjoy!"]
@@ -42,50 +130,156 @@ async def stream_llm_response():
         await asyncio.sleep(0.5)
         yield chunk
 
-# Send LLM chunk to Murf and receive base64 audio
-async def send_to_murf_and_get_audio(llm_chunk):
-    try:
-        async with websockets.connect(MURF_WS_URL) as ws:
-            await ws.send(json.dumps({"text": llm_chunk}))
-            response = await ws.recv()
-            data = json.loads(response)
-            return data.get("audio_base64")
-    except Exception as e:
-        print("Error sending to Murf:", e)
-        return None
+def pcm_rms(pcm: bytes) -> float:
+    samples = array("h", pcm[:len(pcm) - len(pcm) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(x * x for x in samples) / len(samples))
+
 
 # WebSocket endpoint
 @app.websocket("/ws/llm-murf")
 async def llm_murf_ws(websocket: WebSocket):
     await websocket.accept()
     print("Client connected.")
-    audio_chunks = []  # Array to accumulate base64 chunks
+    # ?audio=binary sends raw frames instead of base64 inside JSON
+    binary_audio = websocket.query_params.get("audio") == "binary"
+    audio_chunks = deque(maxlen=AUDIO_RETENTION_CHUNKS)  # bounded ring of recent chunks
+    generation = {"llm_chunks": 0, "tts_chunks": 0}
+    llm_task = None
+    murf = None
+
+    async def send_audio(message):
+        if isinstance(message, bytes):
+            await websocket.send_bytes(message)
+        else:
+            await websocket.send_json(message)
+
+    # Paces audio to real time so bursts from Murf don't pile up in the browser
+    sender = PacedAudioSender(send_audio, lead_ms=PLAYBACK_LEAD_MS, prebuffer_ms=JITTER_PREBUFFER_MS)
+    sender_task = asyncio.create_task(sender.run())
 
     try:
+        # One Murf stream for the whole session; each answer gets its own context
+        out_rate = negotiate_output_rate(websocket)
+        await websocket.send_json({"type": "audio_format", "format": "wav", "sample_rate": out_rate})
+        murf = await MurfStreamClient(murf_ws_url(out_rate), MURF_VOICE_ID).connect()
+        context_id = uuid.uuid4().hex
+
+        # Push LLM text into Murf as it arrives, without waiting for audio
+        async def llm_to_murf_text():
+            chunker = AdaptiveChunker.for_latency(TTS_FIRST_SEGMENT_MS)
+            async for llm_chunk in stream_llm_response():
+                generation["llm_chunks"] += 1
+                for segment in chunker.feed(llm_chunk):
+                    await murf.send_text(segment, context_id)
+            for segment in chunker.flush():
+                await murf.send_text(segment, context_id)
+            await murf.send_text("", context_id, end=True)
+
+        # Forward every audio frame Murf produces for this answer
+        async def murf_to_client():
+            async for audio_base64 in murf.audio(context_id):
+                seq = generation["tts_chunks"]
+                generation["tts_chunks"] += 1
+                # Decode once here: binary mode sends the raw bytes, and pacing needs the duration
+                audio_bytes = base64.b64decode(audio_base64)
+                duration_ms = audio_duration_ms(audio_bytes, sample_rate=out_rate)
+                if binary_audio:
+                    audio_chunks.append(audio_bytes)
+                    await sender.put(FRAME_HEADER.pack(seq) + audio_bytes, duration_ms)
+                    print(f"Queued binary audio frame {seq}: {len(audio_bytes)} bytes, {duration_ms:.0f} ms")
+                else:
+                    audio_chunks.append(audio_base64)
+                    await sender.put({"audio_chunk": audio_base64}, duration_ms)
+                    print("Queued audio chunk:", audio_base64[:60], "...")
+            sender.end_of_stream()
+
         # Task to stream LLM to Murf
         async def llm_to_murf():
-            async for llm_chunk in stream_llm_response():
-                audio_base64 = await send_to_murf_and_get_audio(llm_chunk)
-                if audio_base64:
-                    audio_chunks.append(audio_base64)  # accumulate
-                    await websocket.send_json({"audio_chunk": audio_base64})
-                    print("Sent audio chunk to client:", audio_base64[:60], "...")
+            try:
+                async with murf_slots.slot(INTERACTIVE):
+                    await asyncio.gather(llm_to_murf_text(), murf_to_client())
+            except asyncio.CancelledError:
+                await murf.clear(context_id)
+                raise
+
+        llm_task = asyncio.create_task(llm_to_murf())
+
+        # Cancel the in-flight answer and tell the client to flush playback
+        async def barge_in():
+            if not llm_task.cancel():
+                return
+            sender.flush()
+            print(f"Barge-in: cancelled after {generation['llm_chunks']} LLM chunks "
+                  f"and {generation['tts_chunks']} synthesized chunks")
+            await websocket.send_json({"type": "interrupt", **generation})
 
         # Task to receive audio from client
         async def receive_client_audio():
+            speech_ms = 0.0
             while True:
                 data = await websocket.receive_bytes()
                 print("Received audio buffer from client:", len(data))
+                if llm_task.done() or llm_task.cancelling():
+                    continue
+                chunk_ms = len(data) / 2 / CLIENT_SAMPLE_RATE * 1000
+                speech_ms = speech_ms + chunk_ms if pcm_rms(data) >= BARGE_IN_RMS else 0.0
+                if speech_ms >= BARGE_IN_MS:
+                    await barge_in()
 
-        # Run both tasks concurrently
-        await asyncio.gather(llm_to_murf(), receive_client_audio())
+        # Receive until the client disconnects while the answer streams alongside
+        await receive_client_audio()
 
     except Exception as e:
         print("WebSocket error:", e)
     finally:
+        if llm_task:
+            llm_task.cancel()
+        if murf:
+            await murf.close()
+        sender_task.cancel()
+        print("Playback stats:", sender.stats())
         await websocket.close()
         print("Client disconnected.")
 
+# Full-duplex agent: real-time STT -> streaming Gemini -> streaming Murf
+@app.websocket("/ws/agent")
+async def agent_ws(websocket: WebSocket):
+    await websocket.accept()
+    print("Agent client connected.")
+    # Client sends 16-bit mono PCM at this rate (defaults to AssemblyAI's 16 kHz)
+    requested = websocket.query_params.get("sample_rate", "16000")
+    if not requested.isdigit() or int(requested) not in STT_SAMPLE_RATES:
+        print("Rejected agent client with sample_rate:", requested)
+        await websocket.close(code=1003, reason=f"sample_rate must be one of {STT_SAMPLE_RATES}")
+        return
+    sample_rate = int(requested)
+    out_rate = negotiate_output_rate(websocket)
+    pipeline = VoicePipeline(
+        websocket,
+        gemini_model,
+        assemblyai_api_key=ASSEMBLYAI_API_KEY,
+        murf_ws_url=murf_ws_url(out_rate),
+        murf_voice_id=MURF_VOICE_ID,
+        sample_rate=sample_rate,
+        output_sample_rate=out_rate,
+        playback_lead_ms=PLAYBACK_LEAD_MS,
+        jitter_prebuffer_ms=JITTER_PREBUFFER_MS,
+        gemini_slots=gemini_slots,
+        murf_slots=murf_slots,
+    )
+    try:
+        await pipeline.run()
+    except Exception as e:
+        print("Agent pipeline error:", e)
+    finally:
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass
+        print("Agent client disconnected.")
+
 # Entry point
 if __name__ == "__main__":
     uvicorn.run("main:app",
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import websockets
+
+
+class MurfStreamClient:
+    """One long-lived Murf stream-input WebSocket, multiplexed by context_id.
+
+    Voice config is sent once on connect. Text for any context can be pushed at any
+    time, and a single reader task routes every audio frame to its context's queue.
+    """
+
+    def __init__(self, url: str, voice_id: str):
+        self.url = url
+        self.voice_id = voice_id
+        self.ws = None
+        self.contexts = {}
+        self.closed = False
+        self._reader = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url)
+        await self.ws.send(json.dumps({"voice_config": {"voiceId": self.voice_id}}))
+        self._reader = asyncio.create_task(self._read_loop())
+        return self
+
+    def _queue(self, context_id: str) -> asyncio.Queue:
+        if context_id not in self.contexts:
+            self.contexts[context_id] = asyncio.Queue()
+            if self.closed:
+                self.contexts[context_id].put_nowait(None)
+        return self.contexts[context_id]
+
+    async def send_text(self, text: str, context_id: str, end: bool = False):
+        self._queue(context_id)
+        await self.ws.send(json.dumps({"text": text, "context_id": context_id, "end": end}))
+
+    async def clear(self, context_id: str):
+        """Drop any text Murf has not synthesized yet for this context."""
+        try:
+            await self.ws.send(json.dumps({"context_id": context_id, "clear": True}))
+        except Exception as e:
+            print("Error clearing Murf context:", e)
+        queue = self.contexts.pop(context_id, None)
+        if queue:
+            queue.put_nowait(None)
+
+    async def audio(self, context_id: str):
+        """Yield base64 audio frames for a context until Murf marks it final."""
+        queue = self._queue(context_id)
+        try:
+            while (audio_base64 := await queue.get()) is not None:
+                yield audio_base64
+        finally:
+            self.contexts.pop(context_id, None)
+
+    async def _read_loop(self):
+        try:
+            async for message in self.ws:
+                data = json.loads(message)
+                queue = self.contexts.get(data.get("context_id"))
+                if queue is None:
+                    continue
+                audio_base64 = data.get("audio") or data.get("audio_base64")
+                if audio_base64:
+                    queue.put_nowait(audio_base64)
+                if data.get("final") or data.get("isFinalAudio"):
+                    # Frames stay queued until audio() has drained this context
+                    queue.put_nowait(None)
+        except Exception as e:
+            print("Murf stream closed:", e)
+        finally:
+            # Wake every consumer so no turn waits on a dead socket
+            self.closed = True
+            for queue in self.contexts.values():
+                queue.put_nowait(None)
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if self.ws:
+            await self.ws.close()
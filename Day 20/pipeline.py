@@ -0,0 +1,251 @@
+import asyncio
+import base64
+import contextlib
+import json
+import time
+import uuid
+import websockets
+
+from admission import INTERACTIVE
+from audio_scheduler import PacedAudioSender, audio_duration_ms
+from chunker import AdaptiveChunker
+from murf_stream import MurfStreamClient
+
+ASSEMBLYAI_STREAMING_URL = "wss://streaming.assemblyai.com/v3/ws"
+
+# Bounded hand-off queues between stages; a slow stage applies back-pressure upstream
+AUDIO_QUEUE_SIZE = 50   # ~50 client buffers of mic audio
+TURN_QUEUE_SIZE = 4     # finished user turns waiting for the LLM
+TEXT_QUEUE_SIZE = 64    # LLM text chunks waiting for TTS
+TURN_DONE = object()
+# AssemblyAI v3 takes 50-1000 ms of audio per message; client buffers are re-cut to this
+STT_FRAME_MS = 50
+# Latency budget for the first TTS segment of each answer
+TTS_FIRST_SEGMENT_MS = 250
+
+
+def now_ms() -> float:
+    return time.perf_counter() * 1000
+
+
+class TurnTimings:
+    """Per-turn stage timestamps, reported relative to the end of the user's turn."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.context_id = uuid.uuid4().hex
+        self.marks = {"turn_end": now_ms()}
+
+    def mark(self, name: str):
+        self.marks.setdefault(name, now_ms())
+
+    def report(self) -> dict:
+        start = self.marks["turn_end"]
+        report = {f"{name}_ms": round(t - start, 1) for name, t in self.marks.items() if name != "turn_end"}
+        if "first_audio" in self.marks:
+            report["time_to_first_audio_ms"] = report["first_audio_ms"]
+        return report
+
+
+class FrameRechunker:
+    """Re-chunks arbitrary client buffers into fixed-size frames (as in Day 18)."""
+
+    def __init__(self, frame_bytes: int):
+        self.frame_bytes = frame_bytes
+        self._pending = bytearray()
+
+    def push(self, data: bytes) -> list:
+        frames = []
+        view = memoryview(data)
+        if self._pending:
+            need = self.frame_bytes - len(self._pending)
+            self._pending += view[:need]
+            view = view[need:]
+            if len(self._pending) < self.frame_bytes:
+                return frames
+            frames.append(bytes(self._pending))
+            self._pending.clear()
+        whole = len(view) - len(view) % self.frame_bytes
+        for i in range(0, whole, self.frame_bytes):
+            frames.append(bytes(view[i:i + self.frame_bytes]))
+        if whole < len(view):
+            self._pending += view[whole:]
+        return frames
+
+    def flush(self) -> list:
+        if not self._pending:
+            return []
+        frame = bytes(self._pending)
+        self._pending.clear()
+        return [frame]
+
+
+class VoicePipeline:
+    """Streaming STT -> Gemini -> Murf TTS over one client WebSocket.
+
+    Each stage is its own task connected by bounded asyncio queues:
+    client audio -> AssemblyAI -> turns -> Gemini -> text -> Murf -> client audio.
+    """
+
+    def __init__(self, websocket, gemini_model, assemblyai_api_key: str, murf_ws_url: str,
+                 murf_voice_id: str, sample_rate: int = 16000, output_sample_rate: int = 44100,
+                 playback_lead_ms: float = 250, jitter_prebuffer_ms: float = 150,
+                 gemini_slots=None, murf_slots=None):
+        self.websocket = websocket
+        self.gemini_model = gemini_model
+        self.assemblyai_api_key = assemblyai_api_key
+        self.murf_ws_url = murf_ws_url
+        self.murf_voice_id = murf_voice_id
+        self.sample_rate = sample_rate
+        self.rechunker = FrameRechunker(sample_rate * 2 * STT_FRAME_MS // 1000)  # 16-bit mono
+        self.output_sample_rate = output_sample_rate  # must match the rate in murf_ws_url
+        # Shared AdmissionSchedulers; every turn is admitted as interactive traffic
+        self.gemini_slots = gemini_slots
+        self.murf_slots = murf_slots
+        self._murf_held = {}  # context_id -> exit stack holding that turn's Murf slot
+
+        self.audio_in = asyncio.Queue(maxsize=AUDIO_QUEUE_SIZE)
+        self.turns = asyncio.Queue(maxsize=TURN_QUEUE_SIZE)
+        self.text_out = asyncio.Queue(maxsize=TEXT_QUEUE_SIZE)
+        self.speaking = asyncio.Queue()  # turns whose audio should be forwarded, in order
+        self.stt_ws = None
+        self.murf = None
+        self.sender = PacedAudioSender(self.websocket.send_json, lead_ms=playback_lead_ms,
+                                       prebuffer_ms=jitter_prebuffer_ms)
+
+    async def run(self):
+        url = f"{ASSEMBLYAI_STREAMING_URL}?sample_rate={self.sample_rate}&format_turns=true"
+        async with websockets.connect(url, extra_headers={"Authorization": self.assemblyai_api_key}) as stt_ws:
+            self.stt_ws = stt_ws
+            self.murf = await MurfStreamClient(self.murf_ws_url, self.murf_voice_id).connect()
+            stages = [
+                self.client_to_queue(),
+                self.queue_to_stt(),
+                self.stt_to_turns(),
+                self.turns_to_llm(),
+                self.text_to_tts(),
+                self.tts_to_client(),
+                self.sender.run(),
+            ]
+            tasks = [asyncio.create_task(stage) for stage in stages]
+            try:
+                # The client leaving (or any stage failing) ends the whole pipeline
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception():
+                        raise task.exception()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                for context_id in list(self._murf_held):
+                    await self._release_murf_slot(context_id)
+                await self.murf.close()
+                print("Playback stats:", self.sender.stats())
+
+    def _slot(self, slots):
+        return slots.slot(INTERACTIVE) if slots else contextlib.nullcontext()
+
+    async def _hold_murf_slot(self, context_id: str):
+        # Held from the turn's first text until its last audio, since Murf starts
+        # synthesizing as soon as text arrives
+        if context_id not in self._murf_held:
+            stack = contextlib.AsyncExitStack()
+            await stack.enter_async_context(self._slot(self.murf_slots))
+            self._murf_held[context_id] = stack
+
+    async def _release_murf_slot(self, context_id: str):
+        stack = self._murf_held.pop(context_id, None)
+        if stack:
+            await stack.aclose()
+
+    # --- Stage 1: client mic audio -> fixed 50 ms frames -> bounded queue ---
+    async def client_to_queue(self):
+        try:
+            while True:
+                data = await self.websocket.receive_bytes()
+                for frame in self.rechunker.push(data):
+                    await self.audio_in.put(frame)
+        except Exception:
+            # Client left: send the partial last frame before the pipeline shuts down
+            for frame in self.rechunker.flush():
+                await self.audio_in.put(frame)
+            await self.audio_in.join()
+            raise
+
+    # --- Stage 2: queue -> AssemblyAI (binary PCM) ---
+    async def queue_to_stt(self):
+        while True:
+            frame = await self.audio_in.get()
+            try:
+                await self.stt_ws.send(frame)
+            finally:
+                self.audio_in.task_done()
+
+    # --- Stage 3: AssemblyAI events -> finished turns ---
+    async def stt_to_turns(self):
+        async for message in self.stt_ws:
+            event = json.loads(message)
+            if event.get("type") != "Turn":
+                continue
+            text = event.get("transcript", "").strip()
+            if not text:
+                continue
+            if event.get("end_of_turn") and event.get("turn_is_formatted"):
+                turn = TurnTimings(text)
+                await self.websocket.send_json({"type": "transcript", "text": text, "is_final": True})
+                await self.turns.put(turn)
+            else:
+                await self.websocket.send_json({"type": "transcript", "text": text, "is_final": False})
+
+    # --- Stage 4: turns -> streaming Gemini -> text chunks ---
+    async def turns_to_llm(self):
+        while True:
+            turn = await self.turns.get()
+            await self.speaking.put(turn)
+            chunker = AdaptiveChunker.for_latency(TTS_FIRST_SEGMENT_MS)
+            try:
+                async with self._slot(self.gemini_slots):
+                    turn.mark("llm_admitted")
+                    response = await self.gemini_model.generate_content_async(turn.text, stream=True)
+                    async for chunk in response:
+                        if chunk.text:
+                            turn.mark("llm_first_token")
+                            await self.websocket.send_json({"type": "ai_response", "text": chunk.text})
+                            for segment in chunker.feed(chunk.text):
+                                await self.text_out.put((turn, segment))
+            except Exception as e:
+                print("⚠️ Gemini streaming error:", e)
+            for segment in chunker.flush():
+                await self.text_out.put((turn, segment))
+            turn.mark("llm_done")
+            await self.text_out.put((turn, TURN_DONE))
+
+    # --- Stage 5: text chunks -> Murf stream ---
+    async def text_to_tts(self):
+        while True:
+            turn, text = await self.text_out.get()
+            await self._hold_murf_slot(turn.context_id)
+            if text is TURN_DONE:
+                await self.murf.send_text("", turn.context_id, end=True)
+                continue
+            turn.mark("tts_first_text")
+            await self.murf.send_text(text, turn.context_id)
+
+    # --- Stage 6: Murf audio -> client, one turn at a time ---
+    async def tts_to_client(self):
+        while True:
+            turn = await self.speaking.get()
+            try:
+                async for audio_base64 in self.murf.audio(turn.context_id):
+                    turn.mark("first_audio")
+                    duration_ms = audio_duration_ms(base64.b64decode(audio_base64),
+                                                    sample_rate=self.output_sample_rate)
+                    await self.sender.put({"audio_chunk": audio_base64}, duration_ms)
+            finally:
+                await self._release_murf_slot(turn.context_id)
+            self.sender.end_of_stream()
+            turn.mark("audio_done")
+            report = {**turn.report(), "playback": self.sender.stats()}
+            print("Turn timings:", report)
+            await self.websocket.send_json({"type": "metrics", **report})
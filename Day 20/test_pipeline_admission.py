@@ -0,0 +1,71 @@
+import asyncio
+from collections import defaultdict
+
+from admission import AdmissionScheduler
+from pipeline import VoicePipeline, TurnTimings
+
+
+class FakeWebSocket:
+    async def send_json(self, message):
+        pass
+
+
+class FakeMurf:
+    """Records text sent per context; audio for a context ends when finish() is called."""
+
+    def __init__(self):
+        self.sent = defaultdict(list)
+        self.done = defaultdict(asyncio.Event)
+
+    async def send_text(self, text, context_id, end=False):
+        self.sent[context_id].append(text)
+
+    async def audio(self, context_id):
+        await self.done[context_id].wait()
+        return
+        yield
+
+    def finish(self, context_id):
+        self.done[context_id].set()
+
+
+def session(murf_slots):
+    pipeline = VoicePipeline(FakeWebSocket(), None, assemblyai_api_key="", murf_ws_url="",
+                             murf_voice_id="", murf_slots=murf_slots)
+    pipeline.murf = FakeMurf()
+    return pipeline
+
+
+async def speak(pipeline, text):
+    turn = TurnTimings(text)
+    await pipeline.speaking.put(turn)
+    await pipeline.text_out.put((turn, text))
+    return turn
+
+
+def test_second_session_waits_for_murf_slot():
+    async def run():
+        murf_slots = AdmissionScheduler(capacity=1, interactive_reserve=0)
+        a, b = session(murf_slots), session(murf_slots)
+        tasks = [asyncio.create_task(stage) for p in (a, b) for stage in (p.text_to_tts(), p.tts_to_client())]
+        try:
+            turn_a = await speak(a, "Hello ")
+            await asyncio.sleep(0.05)
+            assert a.murf.sent[turn_a.context_id] == ["Hello "]
+
+            # Session A still holds the only slot: B's text must not reach Murf yet
+            turn_b = await speak(b, "Hi ")
+            await asyncio.sleep(0.05)
+            assert b.murf.sent[turn_b.context_id] == []
+            assert murf_slots.report()["classes"]["interactive"]["queued"] == 1
+
+            # A's audio finishes, releasing the slot to B
+            a.murf.finish(turn_a.context_id)
+            await asyncio.sleep(0.05)
+            assert b.murf.sent[turn_b.context_id] == ["Hi "]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+import json
+import re
+import threading
+import uuid
+from pathlib import Path
+
+BATCH_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class BatchStore:
+    """On-disk state for bulk transcription batches.
+
+    Each batch is a folder under root with the staged audio, batch.json (the item
+    list) and results.jsonl (one line per finished attempt, last line per item wins).
+    Finished items survive a crash or a client disconnect, so a retried batch only
+    transcribes what is still missing and never needs the files uploaded again.
+    Items being transcribed are tracked in memory, so a resume that overlaps a
+    running request does not submit them a second time.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._running = {}  # batch id -> indexes being transcribed
+
+    def create(self) -> str:
+        batch_id = uuid.uuid4().hex
+        (self.root / batch_id).mkdir()
+        self._write_items(batch_id, [])
+        return batch_id
+
+    def exists(self, batch_id: str) -> bool:
+        return bool(BATCH_ID.match(batch_id)) and (self.root / batch_id / "batch.json").exists()
+
+    def items(self, batch_id: str) -> list:
+        return json.loads((self.root / batch_id / "batch.json").read_text())
+
+    def add_file(self, batch_id: str, filename: str, data: bytes) -> dict:
+        items = self.items(batch_id)
+        name = Path(filename or "audio").name
+        path = self.root / batch_id / f"{len(items):05d}_{name}"
+        path.write_bytes(data)
+        return self._add_item(batch_id, items, name, str(path))
+
+    def add_url(self, batch_id: str, url: str, name: str = None) -> dict:
+        items = self.items(batch_id)
+        return self._add_item(batch_id, items, name or url.rsplit("/", 1)[-1] or url, url)
+
+    def results(self, batch_id: str) -> dict:
+        """Latest result per item index."""
+        path = self.root / batch_id / "results.jsonl"
+        latest = {}
+        if path.exists():
+            for line in path.read_text().splitlines():
+                if line.strip():
+                    result = json.loads(line)
+                    latest[result["index"]] = result
+        return latest
+
+    def record(self, batch_id: str, result: dict):
+        with self._lock, open(self.root / batch_id / "results.jsonl", "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+    def pending(self, batch_id: str) -> list:
+        done = {i for i, r in self.results(batch_id).items() if r["status"] == "completed"}
+        return [item for item in self.items(batch_id) if item["index"] not in done]
+
+    def claim_pending(self, batch_id: str) -> list:
+        """Pending items not already running; they count as running until released."""
+        with self._lock:
+            running = self._running.setdefault(batch_id, set())
+            items = [item for item in self.pending(batch_id) if item["index"] not in running]
+            running.update(item["index"] for item in items)
+        return items
+
+    def release(self, batch_id: str, index: int):
+        with self._lock:
+            running = self._running.get(batch_id, set())
+            running.discard(index)
+            if not running:
+                self._running.pop(batch_id, None)
+
+    def running(self, batch_id: str) -> int:
+        with self._lock:
+            return len(self._running.get(batch_id, ()))
+
+    def _add_item(self, batch_id: str, items: list, name: str, source: str) -> dict:
+        item = {"index": len(items), "name": name, "source": source}
+        items.append(item)
+        self._write_items(batch_id, items)
+        return item
+
+    def _write_items(self, batch_id: str, items: list):
+        (self.root / batch_id / "batch.json").write_text(json.dumps(items))
@@ -1,5 +1,5 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -12,7 +12,14 @@ import assemblyai as aai
 import time
 import base64
 import asyncio
-from typing import Optional
+import hashlib
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from batch_store import BatchStore
 
 # Load .env variables
 load_dotenv()
@@ -101,6 +108,128 @@ async def transcribe_audio(file: UploadFile = File(...)):
             "message": str(e)
         }
 
+# -------------------
+# Bulk transcription: many files or a URL manifest, results streamed back as NDJSON
+# -------------------
+
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+# Staged audio and transcripts are private: keep them out of the public /uploads mount
+batches = BatchStore(Path(os.getenv("BATCH_DIR", "batches")))
+transcribe_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="transcribe")
+
+def parse_manifest(manifest: str) -> list:
+    """Manifest is a JSON list of audio URLs or {"url": ..., "name": ...} objects."""
+    entries = []
+    for entry in json.loads(manifest):
+        if isinstance(entry, str):
+            url, name = entry, None
+        else:
+            url, name = entry["url"], entry.get("name")
+        # The SDK uploads any non-URL string as a local file, so only web URLs are allowed
+        if not isinstance(url, str) or urlparse(url).scheme not in ("http", "https"):
+            raise ValueError(f"not an http(s) URL: {url!r}")
+        entries.append((url, name))
+    return entries
+
+def transcribe_and_record(batch_id: str, item: dict) -> dict:
+    # Runs in the threadpool and records its own result, so a transcription that is
+    # already running still lands in results.jsonl if the client disconnects
+    start = time.time()
+    try:
+        transcript = transcriber.transcribe(item["source"])
+        if transcript.error:
+            raise Exception(transcript.error)
+        result = {"index": item["index"], "name": item["name"], "status": "completed",
+                  "transcription": transcript.text}
+    except Exception as e:
+        result = {"index": item["index"], "name": item["name"], "status": "error", "message": str(e)}
+    result["seconds"] = round(time.time() - start, 2)
+    batches.record(batch_id, result)
+    return result
+
+async def transcribe_item(batch_id: str, item: dict, semaphore: asyncio.Semaphore, started: set) -> dict:
+    async with semaphore:
+        started.add(item["index"])
+        future = transcribe_pool.submit(transcribe_and_record, batch_id, item)
+        # The item stays claimed until its thread is done, even if the client left
+        future.add_done_callback(lambda _: batches.release(batch_id, item["index"]))
+        return await asyncio.wrap_future(future)
+
+@app.post("/transcribe/batch")
+async def transcribe_batch(
+    files: List[UploadFile] = File(None),
+    manifest: Optional[str] = Form(None),
+    batch_id: Optional[str] = Form(None)
+):
+    entries = []
+    if manifest:
+        try:
+            entries = parse_manifest(manifest)
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid manifest: {e}")
+
+    # Resume: send only batch_id (plus any new entries); finished items are not redone
+    if batch_id:
+        if not batches.exists(batch_id):
+            raise HTTPException(status_code=404, detail="Unknown batch_id")
+    elif not files and not manifest:
+        raise HTTPException(status_code=400, detail="Provide files, a manifest, or a batch_id to resume")
+    else:
+        batch_id = batches.create()
+
+    # Stage everything on disk before streaming starts; uploads are closed after this returns
+    for file in files or []:
+        batches.add_file(batch_id, file.filename, await file.read())
+    for url, name in entries:
+        batches.add_url(batch_id, url, name)
+
+    total = len(batches.items(batch_id))
+
+    async def stream_results():
+        # Items an earlier request is still transcribing are left to it; poll
+        # GET /transcribe/batch/{id} for those
+        pending = batches.claim_pending(batch_id)
+        running = batches.running(batch_id) - len(pending)
+        finished = [r for r in batches.results(batch_id).values() if r["status"] == "completed"]
+        semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+        tasks, started = [], set()
+        counts = {"completed": len(finished), "error": 0}
+        try:
+            yield json.dumps({"type": "batch", "batch_id": batch_id, "total": total,
+                              "pending": len(pending), "running_elsewhere": running}) + "\n"
+            for result in finished:
+                yield json.dumps({"type": "result", **result, "resumed": True}) + "\n"
+
+            tasks = [asyncio.create_task(transcribe_item(batch_id, item, semaphore, started))
+                     for item in pending]
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                counts[result["status"]] += 1
+                yield json.dumps({"type": "result", **result}) + "\n"
+        finally:
+            # Client went away: drop queued items, running ones still record their result
+            for task in tasks:
+                task.cancel()
+            for item in pending:
+                if item["index"] not in started:
+                    batches.release(batch_id, item["index"])
+        yield json.dumps({"type": "summary", "batch_id": batch_id, **counts}) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/transcribe/batch/{batch_id}")
+def transcribe_batch_status(batch_id: str):
+    if not batches.exists(batch_id):
+        raise HTTPException(status_code=404, detail="Unknown batch_id")
+    results = batches.results(batch_id)
+    return {
+        "batch_id": batch_id,
+        "total": len(batches.items(batch_id)),
+        "completed": sum(1 for r in results.values() if r["status"] == "completed"),
+        "running": batches.running(batch_id),
+        "results": [results[i] for i in sorted(results)]
+    }
+
 # -------------------
 # NEW /tts/echo endpoint combining transcription + Murf voice generation + saving audio locally and returning URL
 # -------------------
@@ -119,6 +248,26 @@ def generate_murf_audio_sync(text: str, voice_id: Optional[str] = "en-US-terrell
     response.raise_for_status()
     return response.json()
 
+def save_murf_audio(murf_resp_json: dict, save_path: Path):
+    # Extract audio URL or base64 audio
+    audio_url = murf_resp_json.get("audio_url") or murf_resp_json.get("audioFile")
+    if audio_url:
+        r = requests.get(audio_url, stream=True)
+        r.raise_for_status()
+        with open(save_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+        return
+    # try base64 audio
+    b64_audio = murf_resp_json.get("audio") or murf_resp_json.get("audio_base64")
+    if not b64_audio:
+        raise Exception("Murf response doesn't contain audio_url, audioFile, or base64 audio")
+    if b64_audio.startswith("data:"):
+        b64_audio = b64_audio.split(",", 1)[1]
+    with open(save_path, "wb") as f:
+        f.write(base64.b64decode(b64_audio))
+
 @app.post("/tts/echo")
 async def echo_tts(file: UploadFile = File(...)):
     try:
@@ -146,30 +295,11 @@ async def echo_tts(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Murf generation failed: {e}")
 
-    # Extract audio URL or base64 audio
-    audio_url = murf_resp_json.get("audio_url") or murf_resp_json.get("audioFile")
-
     filename = f"murf_echo_{int(time.time())}.mp3"
     save_path = uploads_dir / filename
 
     try:
-        if audio_url:
-            r = requests.get(audio_url, stream=True)
-            r.raise_for_status()
-            with open(save_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-        else:
-            # try base64 audio
-            b64_audio = murf_resp_json.get("audio") or murf_resp_json.get("audio_base64")
-            if not b64_audio:
-                raise Exception("Murf response doesn't contain audio_url, audioFile, or base64 audio")
-            if b64_audio.startswith("data:"):
-                b64_audio = b64_audio.split(",", 1)[1]
-            audio_data = base64.b64decode(b64_audio)
-            with open(save_path, "wb") as f:
-                f.write(audio_data)
+        save_murf_audio(murf_resp_json, save_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to obtain/save Murf audio: {e}")
 
@@ -178,3 +308,119 @@ async def echo_tts(file: UploadFile = File(...)):
         "transcription": text,
         "audio_url": f"/uploads/{filename}"
     }
+
+# -------------------
+# Bulk TTS: render many texts in parallel, deduped, streamed back as a manifest or a zip
+# -------------------
+
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+tts_dir = uploads_dir / "tts"
+tts_dir.mkdir(exist_ok=True)
+
+class BulkTTSItem(BaseModel):
+    text: str
+    voice_id: Optional[str] = None
+
+class BulkTTSRequest(BaseModel):
+    items: List[BulkTTSItem]
+    voice_id: str = "en-US-terrell"
+    archive: bool = False  # stream a zip of the MP3s instead of an NDJSON manifest
+
+def tts_cache_key(text: str, voice_id: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{voice_id}\n{normalized}".encode("utf-8")).hexdigest()[:32]
+
+def render_tts(key: str, text: str, voice_id: str) -> Path:
+    """Render one text to uploads/tts/<key>.mp3; files rendered earlier are reused."""
+    save_path = tts_dir / f"{key}.mp3"
+    if save_path.exists():
+        return save_path
+    murf_resp_json = generate_murf_audio_sync(text, voice_id)
+    tmp_path = save_path.with_suffix(".part")
+    save_murf_audio(murf_resp_json, tmp_path)
+    tmp_path.replace(save_path)  # never expose a half-written file
+    return save_path
+
+class ZipStream:
+    """Write-only sink for zipfile that hands back the bytes written so far."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+@app.post("/tts/batch")
+async def tts_batch(request: BulkTTSRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items to render")
+
+    # Identical (voice, text) pairs are rendered once and shared by every index
+    unique = {}
+    for index, item in enumerate(request.items):
+        if not item.text.strip():
+            raise HTTPException(status_code=400, detail=f"Item {index} has empty text")
+        voice_id = item.voice_id or request.voice_id
+        key = tts_cache_key(item.text, voice_id)
+        entry = unique.setdefault(key, {"key": key, "text": item.text, "voice_id": voice_id, "indices": []})
+        entry["indices"].append(index)
+
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+    async def render(entry: dict) -> dict:
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            start = time.time()
+            try:
+                path = await loop.run_in_executor(None, render_tts, entry["key"], entry["text"], entry["voice_id"])
+                result = {"status": "success", "audio_url": f"/uploads/tts/{path.name}", "path": path}
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            result["seconds"] = round(time.time() - start, 2)
+            return {**entry, **result}
+
+    async def completed():
+        tasks = [asyncio.create_task(render(entry)) for entry in unique.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    header = {"type": "batch", "items": len(request.items), "unique": len(unique)}
+
+    async def stream_manifest():
+        yield json.dumps(header) + "\n"
+        async for result in completed():
+            result.pop("path", None)
+            yield json.dumps({"type": "result", **result}) + "\n"
+
+    async def stream_archive():
+        # MP3 is already compressed, so entries are stored; the zip is written as results arrive
+        sink = ZipStream()
+        manifest = []
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            async for result in completed():
+                path = result.pop("path", None)
+                if path:
+                    result["file"] = f"{result['key']}.mp3"
+                    archive.writestr(result["file"], path.read_bytes())
+                manifest.append(result)
+                yield sink.drain()
+            archive.writestr("manifest.json", json.dumps({**header, "results": manifest}, indent=2))
+        yield sink.drain()
+
+    if request.archive:
+        return StreamingResponse(stream_archive(), media_type="application/zip",
+                                 headers={"Content-Disposition": 'attachment; filename="tts_batch.zip"'})
+    return StreamingResponse(stream_manifest(), media_type="application/x-ndjson")
@@ -0,0 +1,21 @@
+import json
+import os
+import tempfile
+
+BATCH_DIR = tempfile.mkdtemp()
+os.environ["BATCH_DIR"] = BATCH_DIR
+os.environ.setdefault("ASSEMBLYAI_API_KEY", "test")  # never called: requests are rejected first
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def test_local_path_manifest_is_rejected():
+    for source in ["/etc/passwd", "../.env", {"url": "file:///etc/passwd", "name": "x"}]:
+        resp = client.post("/transcribe/batch", data={"manifest": json.dumps([source])})
+        assert resp.status_code == 400
+    # Rejected before a batch folder was created
+    assert os.listdir(BATCH_DIR) == []